@@ -0,0 +1,74 @@
+"""
+Micro-benchmark comparing Stage 1 cleaning throughput of the original
+function chain against CleaningEngine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cleaning
+"""
+import argparse
+import random
+import time
+from text_cleaner import cleaning
+
+WORDS = ["മലയാളം", "ഭാഷ", "കേരളം", "സംസ്ഥാനം", "ചരിത്രം", "സാഹിത്യം", "നദി", "ജനങ്ങൾ"]
+MARKUP = ["[[ചിത്രം:Kerala.jpg]]", "<templatestyles src=\"x\"/>", "==ചരിത്രം==", "<br>", "\t", "\n\n\n"]
+
+
+def _sample_text(size_bytes: int, seed: int = 0) -> str:
+    """
+    Builds a synthetic wiki-like Malayalam document of roughly `size_bytes`.
+    """
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        token = rng.choice(MARKUP) if rng.random() < 0.05 else rng.choice(WORDS) + " "
+        parts.append(token)
+        total += len(token.encode('utf-8'))
+    return "ശീർഷകം\n" + "".join(parts)
+
+
+def _function_chain(text: str, title: str, aggressive: bool) -> str:
+    text = cleaning.remove_wiki_markup(text)
+    text = cleaning.remove_repeated_title(text, title)
+    text = cleaning.remove_tags(text)
+    if aggressive:
+        text = cleaning.strict_mal_char(text)
+    return cleaning.remove_extra_whitespace(text)
+
+
+def _throughput(func, text: str, repeats: int) -> float:
+    """
+    Returns the best observed throughput in MB/s over `repeats` runs.
+    """
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return size_mb / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage 1 cleaning micro-benchmark")
+    parser.add_argument('--size-mb', type=float, default=4.0, help='Size of the synthetic document')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per variant')
+    args = parser.parse_args()
+
+    text = _sample_text(int(args.size_mb * 1024 * 1024))
+    title = "ശീർഷകം"
+
+    for aggressive in (False, True):
+        engine = cleaning.CleaningEngine({'use_aggressive_char_removal': aggressive})
+        chain_mbps = _throughput(lambda t: _function_chain(t, title, aggressive), text, args.repeats)
+        engine_mbps = _throughput(lambda t: engine.clean(t, title), text, args.repeats)
+        print(
+            f"aggressive={aggressive!s:5}  function chain: {chain_mbps:7.1f} MB/s  "
+            f"CleaningEngine: {engine_mbps:7.1f} MB/s  speedup: {engine_mbps / chain_mbps:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,9 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict
-from text_cleaner.ingestion import ingest_from_dir
-from text_cleaner.pipeline import cleaning_pipeline
-from text_cleaner.formatting import save_to_jsonl
+from text_cleaner.ingestion import ingest_from_dir, iter_from_dir
+from text_cleaner.pipeline import cleaning_pipeline, iter_pipeline
+from text_cleaner.formatting import JsonlWriter, save_to_jsonl
 
 def setup_logging():
     """
@@ -41,6 +41,29 @@ def load_config(config_path: str) -> Dict:
         logging.error(f"Configuration file not found at {config_path}")
         exit()
 
+def run_streaming(config: Dict, raw_data_path: str, output_file_path: Path, discarded_file_path: Path):
+    """
+    Runs the pipeline in streaming mode, writing each record as soon as it
+    leaves the pipeline. Returns the first few cleaned documents for preview.
+    """
+    preview = []
+
+    with JsonlWriter(output_file_path) as cleaned_writer, \
+            JsonlWriter(discarded_file_path, lazy=True) as discarded_writer:
+        for doc in iter_pipeline(iter_from_dir(raw_data_path, config), config):
+            if 'discard_reason' in doc:
+                discarded_writer.write(doc)
+            else:
+                cleaned_writer.write(doc)
+                if len(preview) < 3:
+                    preview.append(doc)
+
+    logging.info(f"Saved {cleaned_writer.count} cleaned documents to {output_file_path}")
+    if discarded_writer.count:
+        logging.info(f"Saved {discarded_writer.count} discarded documents to {discarded_file_path} for review.")
+
+    return preview, cleaned_writer.count
+
 def main():
     """
     Main function to run the corpus cleaning pipeline.
@@ -62,26 +85,32 @@ def main():
     
     logging.info("--- Starting Corpus Cleaning Toolkit ---")
 
-    documents = ingest_from_dir(raw_data_path)
-    logging.info(f"Found {len(documents)} documents to process.\n")
+    output_file_path = Path(processed_data_path) / output_filename
+    discarded_file_path = Path(processed_data_path) / discarded_filename
 
-    if not documents:
-        logging.warning("No documents were found. Exiting.")
-        return
+    if config.get('pipeline', {}).get('streaming', True):
+        preview, cleaned_count = run_streaming(config, raw_data_path, output_file_path, discarded_file_path)
+    else:
+        documents = ingest_from_dir(raw_data_path, config)
+        logging.info(f"Found {len(documents)} documents to process.\n")
 
-    cleaned_documents, discarded_documents = cleaning_pipeline(documents, config)
+        if not documents:
+            logging.warning("No documents were found. Exiting.")
+            return
 
-    output_file_path = Path(processed_data_path) / output_filename
-    logging.info(f"Saving {len(cleaned_documents)} cleaned documents to {output_file_path}")
-    save_to_jsonl(cleaned_documents, output_file_path)
+        cleaned_documents, discarded_documents = cleaning_pipeline(documents, config)
+
+        logging.info(f"Saving {len(cleaned_documents)} cleaned documents to {output_file_path}")
+        save_to_jsonl(cleaned_documents, output_file_path)
+
+        if discarded_documents:
+            logging.info(f"Saving {len(discarded_documents)} discarded documents to {discarded_file_path} for review.")
+            save_to_jsonl(discarded_documents, discarded_file_path)
 
-    if discarded_documents:
-        discarded_file_path = Path(processed_data_path) / discarded_filename
-        logging.info(f"Saving {len(discarded_documents)} discarded documents to {discarded_file_path} for review.")
-        save_to_jsonl(discarded_documents, discarded_file_path)
+        preview, cleaned_count = cleaned_documents[:3], len(cleaned_documents)
 
-    logging.info(f"--- Verification: Inspecting first 3 of {len(cleaned_documents)} final documents ---")
-    for doc in cleaned_documents[:3]:
+    logging.info(f"--- Verification: Inspecting first {len(preview)} of {cleaned_count} final documents ---")
+    for doc in preview:
         print(json.dumps(doc, indent=2, ensure_ascii=False))
         print("-" * 20)
 
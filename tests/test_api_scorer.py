@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+llm_scorer = pytest.importorskip("text_cleaner.llm_scorer")
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Stand-in for the Gemini client: `generate_content_async` answers after
+    `delays[text]` seconds, or raises the next queued error for a text.
+    """
+
+    def __init__(self, delays=None, errors=None):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.calls = []
+        self.completed = []
+
+    async def generate_content_async(self, prompt):
+        text = prompt[len(llm_scorer._PROMPT_PREFIX):-len(llm_scorer._PROMPT_SUFFIX)]
+        self.calls.append(text)
+        if text in self.delays:
+            await asyncio.sleep(self.delays[text])
+        if self.errors.get(text):
+            raise self.errors[text].pop(0)
+        self.completed.append(text)
+        return Response(json.dumps({'score': int(text.split()[-1]), 'reason': f"reason {text}"}))
+
+
+def _score(documents, model, **api_config):
+    loop = asyncio.new_event_loop()
+    try:
+        config = {'api_config': {'retry_delay_seconds': 0, **api_config}}
+        return llm_scorer._score_with_api(documents, model, config, loop, llm_scorer.TokenBucketLimiter())
+    finally:
+        loop.close()
+
+
+def _chunks(count):
+    return [{'text': f"ഭാഗം {i}", 'chunk_id': i} for i in range(1, count + 1)]
+
+
+def test_results_stay_in_place_when_requests_complete_out_of_order():
+    documents = _chunks(4)
+    # Later chunks answer first
+    model = FakeModel(delays={doc['text']: 0.01 * (5 - doc['chunk_id']) for doc in documents})
+
+    _score(documents, model, concurrency=4)
+
+    assert model.completed == [doc['text'] for doc in reversed(documents)]
+    for doc in documents:
+        assert doc['llm_score'] == doc['chunk_id']
+        assert doc['llm_reason'] == f"reason {doc['text']}"
+        assert 'llm_error' not in doc
+
+
+def test_errors_are_retried_with_exponential_backoff(monkeypatch):
+    sleeps = []
+
+    async def record_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_scorer.asyncio, 'sleep', record_sleep)
+    # No jitter: each delay is half the backoff
+    monkeypatch.setattr(llm_scorer.random, 'uniform', lambda low, high: 0)
+
+    documents = _chunks(3)[2:]
+    model = FakeModel(errors={documents[0]['text']: [RuntimeError("unavailable"), RuntimeError("unavailable")]})
+
+    _score(documents, model, max_retries=3, retry_delay_seconds=2, backoff_max_seconds=60)
+
+    assert len(model.calls) == 3
+    assert sleeps == [1.0, 2.0]
+    assert documents[0]['llm_score'] == 3 and documents[0]['llm_reason'] == f"reason {documents[0]['text']}"
+    assert 'llm_error' not in documents[0]
+
+
+def test_chunk_is_marked_failed_after_max_retries(monkeypatch):
+    sleeps = []
+
+    async def record_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_scorer.asyncio, 'sleep', record_sleep)
+    monkeypatch.setattr(llm_scorer.random, 'uniform', lambda low, high: 0)
+
+    documents = _chunks(2)
+    model = FakeModel(errors={documents[0]['text']: [RuntimeError("unavailable")] * 4})
+
+    _score(documents, model, max_retries=4, retry_delay_seconds=2, backoff_max_seconds=3)
+
+    assert model.calls.count(documents[0]['text']) == 4
+    # Backoff doubles up to backoff_max_seconds; none after the last attempt
+    assert sleeps == [1.0, 1.5, 1.5]
+    assert documents[0]['llm_score'] == 1
+    assert documents[0]['llm_reason'] == 'API error after multiple retries'
+    assert documents[0]['llm_error'] is True
+    assert documents[1]['llm_score'] == 2 and 'llm_error' not in documents[1]
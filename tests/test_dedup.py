@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+dedup = pytest.importorskip("text_cleaner.dedup")
+
+
+def _texts(count, seed=0):
+    generator = random.Random(seed)
+    return [f"ഭാഗം {i} {generator.getrandbits(64):x}" for i in range(count)]
+
+
+def test_digest_index_finds_digests_across_spilled_runs(tmp_path):
+    index = dedup.DigestIndex(expected_items=1000, bloom_error_rate=0.01, max_memory_items=64, spill_dir=tmp_path)
+    texts = _texts(500)
+
+    assert all(index.add_text(text) for text in texts)
+    assert len(index._runs) == 500 // 64
+    assert len(index) == 500
+
+    # Every earlier text is found, whether spilled or still in memory
+    assert not any(index.add_text(text) for text in texts)
+    assert all(index.add_text(text) for text in _texts(500, seed=1))
+    assert len(index) == 1000
+    index.close()
+
+
+def test_saved_digest_index_loads_with_bloom_filter(tmp_path):
+    index = dedup.DigestIndex(expected_items=1000, max_memory_items=100, spill_dir=tmp_path / 'spill')
+    texts = _texts(300)
+    for text in texts:
+        index.add_text(text)
+    index.save(tmp_path / 'index.npy')
+    index.close()
+
+    loaded = dedup.DigestIndex.load(tmp_path / 'index.npy', expected_items=1000, bloom_error_rate=0.01)
+    assert len(loaded) == 300
+    assert all(dedup.digest64(text.encode('utf-8')) in loaded._bloom for text in texts)
+
+    assert not any(loaded.add_text(text) for text in texts)
+    new_texts = _texts(300, seed=1)
+    assert all(loaded.add_text(text) for text in new_texts)
+    assert not any(loaded.add_text(text) for text in new_texts)
+    assert len(loaded) == 600
+    loaded.close()
+
+
+WORDS = [
+    'കേരളം', 'മലയാളം', 'ഭാഷ', 'സംസ്ഥാനം', 'ചരിത്രം', 'സാഹിത്യം', 'നദി', 'പുഴ', 'ജനങ്ങൾ',
+    'വിദ്യാഭ്യാസം', 'കാണുക', 'ഇതും', 'തലസ്ഥാനം', 'കടൽ', 'മഴ', 'വയൽ', 'ഗ്രാമം', 'നഗരം',
+]
+
+
+def _article(seed, lines=20, words_per_line=12):
+    generator = random.Random(seed)
+    return '\n'.join(
+        ' '.join(generator.choice(WORDS) for _ in range(words_per_line)) + '.'
+        for _ in range(lines)
+    )
+
+
+@pytest.mark.parametrize("max_memory_items", [None, 20])
+def test_minhash_flags_one_line_edit_and_passes_unrelated_text(tmp_path, max_memory_items):
+    lsh = dedup.MinHashLSH(threshold=0.8, num_perm=128, max_memory_items=max_memory_items, spill_dir=tmp_path)
+    original = _article(seed=0)
+    lines = original.split('\n')
+    lines[7] = 'ഈ ഒരു വരി മാത്രം പുതുതായി എഴുതിയതാണ്.'
+    edited = '\n'.join(lines)
+
+    assert lsh.add(original) is None
+    for seed in range(1, 6):
+        assert lsh.add(_article(seed)) is None
+
+    assert lsh.add(edited) == f"{dedup.digest64(original.encode('utf-8')):016x}"
+    lsh.close()
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+ingestion = pytest.importorskip("text_cleaner.ingestion")
+from bs4 import BeautifulSoup
+
+DUMP = (
+    '<doc id="1" url="https://ml.wikipedia.org/wiki?curid=1" title="കേരളം">\n'
+    'കേരളം\n\nഇന്ത്യയുടെ തെക്കേ അറ്റത്തുള്ള സംസ്ഥാനമാണ് കേരളം &amp; അതിന്റെ തലസ്ഥാനം തിരുവനന്തപുരം.\n'
+    '</doc>\n'
+    'stray text between documents\n'
+    '<doc id="2" url="https://ml.wikipedia.org/wiki?curid=2" title="മലയാളം">\n'
+    '<a href="x">മലയാളം</a> ഒരു <b>ദ്രാവിഡ</b> ഭാഷയാണ്.\n'
+    '</doc>\n'
+    '<doc id="3" title="no text"></doc>\n'
+    '<doc url="https://ml.wikipedia.org/wiki?curid=4" title="no id">ഐഡി ഇല്ല</doc>\n'
+    "<DOC id='5' title='Quotes &quot;here&quot;'>ഒറ്റ ഉദ്ധരണി</DOC >\n"
+    '<doc id="6" url="https://ml.wikipedia.org/wiki?curid=6" title="അവസാനം">\n'
+    'അവസാനത്തെ ലേഖനം അടച്ചിട്ടില്ല'
+)
+
+
+def _find_all_docs(text, file_path):
+    """
+    The documents the BeautifulSoup `find_all('doc')` extraction returned
+    before the streaming scanner replaced it.
+    """
+    documents = []
+    for doc in BeautifulSoup(text, 'html.parser').find_all('doc'):
+        doc_text = doc.get_text(strip=True)
+        if doc.get('id') and doc.get('title') and doc_text:
+            documents.append({
+                'id': doc.get('id'),
+                'url': doc.get('url'),
+                'title': doc.get('title'),
+                'text': doc_text,
+                'filename': file_path.name,
+                'filepath': str(file_path.resolve()),
+            })
+    return documents
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 7, 64, 1 << 20])
+def test_streaming_scanner_matches_find_all_across_block_boundaries(monkeypatch, tmp_path, read_size):
+    monkeypatch.setattr(ingestion, '_READ_SIZE', read_size)
+    file_path = tmp_path / 'wiki_00'
+
+    documents = list(ingestion._iter_docs(io.StringIO(DUMP), file_path))
+
+    assert documents == _find_all_docs(DUMP, file_path)
+    assert [doc['id'] for doc in documents] == ['1', '2', '5', '6']
+
+
+@pytest.mark.parametrize("read_size", [1, 5])
+def test_file_without_doc_tags_is_one_document(monkeypatch, tmp_path, read_size):
+    monkeypatch.setattr(ingestion, '_READ_SIZE', read_size)
+    file_path = tmp_path / 'notes.txt'
+    text = '<p>ടാഗുകളില്ലാത്ത</p> ഒരു ഫയൽ'
+
+    documents = list(ingestion._iter_docs(io.StringIO(text), file_path))
+
+    assert [doc['text'] for doc in documents] == ['ടാഗുകളില്ലാത്തഒരു ഫയൽ']
+    assert documents[0]['id'] == 'notes.txt' and documents[0]['title'] == 'notes'
+
+
+def test_memory_mapped_scanner_matches_streaming_scanner(tmp_path):
+    file_path = tmp_path / 'wiki_00'
+    file_path.write_text(DUMP, encoding='utf-8')
+
+    assert list(ingestion._iter_docs_mmap(file_path)) == _find_all_docs(DUMP, file_path)
+
+
+@pytest.mark.parametrize("span_size", [1, 40, 200, 1 << 20])
+def test_file_parts_yield_the_same_documents_as_the_whole_file(tmp_path, span_size):
+    file_path = tmp_path / 'wiki_00'
+    file_path.write_text(DUMP + '</doc>\n' + DUMP.replace('id="', 'id="x'), encoding='utf-8')
+
+    spans = ingestion._mmap_spans(file_path, span_size)
+    parts = [doc for span in spans for doc in ingestion._handle_text_span(file_path, None, span)]
+
+    assert spans[0][0] == 0 and spans[-1][1] == file_path.stat().st_size
+    assert all(previous[1] == span[0] for previous, span in zip(spans, spans[1:]))
+    assert parts == list(ingestion._iter_docs_mmap(file_path))
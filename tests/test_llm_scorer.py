@@ -0,0 +1,155 @@
+import zlib
+
+import pytest
+
+llm_scorer = pytest.importorskip("text_cleaner.llm_scorer")
+
+ANSWER_TOKENS = 3
+
+
+class CountingLlama:
+    """
+    Stand-in for llama_cpp.Llama that keeps a token-level KV cache and counts
+    every token it evaluates.
+
+    Calls reuse the longest cached prefix of the prompt (re-evaluating at
+    least its last token), like llama-cpp-python's own prefix matching.
+    """
+
+    def __init__(self):
+        self.input_ids = []
+        self.n_tokens = 0
+        self.evaluated = 0
+        self.snapshots = 0
+
+    def tokenize(self, data, add_bos=True):
+        tokens = [zlib.crc32(word.encode('utf-8')) % 50_000 + 2 for word in data.decode('utf-8').split()]
+        return [1] + tokens if add_bos else tokens
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        self.input_ids = self.input_ids[:self.n_tokens] + list(tokens)
+        self.n_tokens = len(self.input_ids)
+        self.evaluated += len(tokens)
+
+    def save_state(self):
+        self.snapshots += 1
+        return list(self.input_ids[:self.n_tokens])
+
+    def load_state(self, state):
+        self.input_ids = list(state)
+        self.n_tokens = len(state)
+
+    def __call__(self, tokens, **kwargs):
+        matched = 0
+        for cached, token in zip(self.input_ids[:self.n_tokens], tokens):
+            if cached != token:
+                break
+            matched += 1
+        self.n_tokens = min(matched, len(tokens) - 1)
+        self.eval(tokens[self.n_tokens:])
+        self.eval([0] * ANSWER_TOKENS)
+        return {
+            'choices': [{'text': '{"score": 8, "reason": "ok"}'}],
+            'usage': {'prompt_tokens': len(tokens), 'completion_tokens': ANSWER_TOKENS},
+        }
+
+
+def _session(prefix_cache, throughput_baseline=False):
+    llm = CountingLlama()
+    config = {'prefix_cache': prefix_cache, 'json_grammar': False, 'throughput_baseline': throughput_baseline}
+    return llm, llm_scorer._LocalSession(llm, config)
+
+
+def _chunk(i):
+    return {'text': f"ഇത് {i} എന്ന ഭാഗത്തിന്റെ വാചകമാണ്", 'chunk_id': i}
+
+
+def _suffix_length(llm, text, template):
+    return len(llm.tokenize((text + template.suffix).encode('utf-8'), add_bos=False))
+
+
+def _shared_prefix_length(llm, templates):
+    first, second = (llm.tokenize(template.prefix.encode('utf-8')) for template in templates)
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+def test_restored_prefix_leaves_only_suffix_and_answer_to_evaluate():
+    llm, session = _session(prefix_cache=True)
+    llm_scorer._score_with_local([_chunk(0)], session)
+    llm_scorer._score_with_local([_chunk(0)], session, llm_scorer._SCORE_ONLY_PROMPT)
+
+    # Clobber the KV cache, e.g. with a prompt that has another prefix
+    llm.reset()
+    llm.eval(llm.tokenize(b"something else entirely"))
+    llm.evaluated = 0
+
+    chunk = _chunk(1)
+    llm_scorer._score_with_local([chunk], session)
+
+    assert chunk['llm_score'] == 8
+    assert session.stats['local_prefix_restores'] == 1
+    assert llm.evaluated == _suffix_length(llm, chunk['text'], llm_scorer._FULL_PROMPT) + ANSWER_TOKENS
+
+
+def test_single_template_takes_no_snapshot():
+    # With one template, llama.cpp's prefix matching already keeps the
+    # prefix cached, so no snapshot is taken and nothing extra is evaluated
+    evaluated = {}
+    for prefix_cache in (True, False):
+        llm, session = _session(prefix_cache)
+        llm_scorer._score_with_local([_chunk(i) for i in range(5)], session)
+        evaluated[prefix_cache] = llm.evaluated
+        assert llm.snapshots == 0
+        assert session.stats['local_prefix_restores'] == 0
+
+    assert evaluated[True] == evaluated[False]
+
+
+def test_snapshot_saves_prefix_when_templates_alternate():
+    templates = (llm_scorer._SCORE_ONLY_PROMPT, llm_scorer._FULL_PROMPT)
+    evaluated = {}
+    snapshots = {}
+    for prefix_cache in (True, False):
+        llm, session = _session(prefix_cache)
+        for i in range(4):
+            for template in templates:
+                llm_scorer._score_with_local([_chunk(i)], session, template)
+        evaluated[prefix_cache] = llm.evaluated
+        snapshots[prefix_cache] = llm.snapshots
+
+    # With snapshots each prefix is evaluated once (the second one after
+    # the leading tokens it shares with the first), then every call only
+    # evaluates its chunk suffix and answer
+    prefixes = sum(len(llm.tokenize(template.prefix.encode('utf-8'))) for template in templates)
+    suffixes = sum(
+        _suffix_length(llm, _chunk(i)['text'], template) + ANSWER_TOKENS
+        for i in range(4) for template in templates
+    )
+    assert evaluated[True] == prefixes - _shared_prefix_length(llm, templates) + suffixes
+    assert snapshots == {True: 2, False: 0}
+    assert evaluated[False] > evaluated[True]
+
+
+def test_throughput_baseline_evaluates_first_prompt_without_reuse():
+    llm, session = _session(prefix_cache=True, throughput_baseline=True)
+    prefix = llm.tokenize(llm_scorer._FULL_PROMPT.prefix.encode('utf-8'))
+    chunks = [_chunk(0), _chunk(1)]
+
+    llm_scorer._score_with_local(chunks[:1], session)
+    suffix = _suffix_length(llm, chunks[0]['text'], llm_scorer._FULL_PROMPT)
+    # Nothing is snapshotted, so the baseline is the only evaluation
+    assert llm.evaluated == len(prefix) + suffix + ANSWER_TOKENS
+    assert llm.snapshots == 0
+    assert session.stats['local_baseline_tokens'] == len(prefix) + suffix + ANSWER_TOKENS
+    assert session.stats['local_prompt_tokens'] == 0
+
+    llm_scorer._score_with_local(chunks[1:], session)
+    assert session.stats['local_prompt_tokens'] > 0
@@ -0,0 +1,76 @@
+import asyncio
+
+from text_cleaner import rate_limit
+from text_cleaner.rate_limit import TokenBucketLimiter
+
+
+class FakeClock:
+    """
+    Patched `time.monotonic` whose time only moves when the limiter sleeps,
+    recording every wait.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.waits.append(round(seconds, 6))
+        self.now += seconds
+
+
+def _clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limit.asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+def _acquire_all(limiter, tokens):
+    async def acquire():
+        for count in tokens:
+            await limiter.acquire(count)
+    asyncio.run(acquire())
+
+
+def test_requests_per_minute_allow_a_burst_then_wait(monkeypatch):
+    clock = _clock(monkeypatch)
+    limiter = TokenBucketLimiter(requests_per_minute=60)
+
+    _acquire_all(limiter, [0] * 60)
+    assert clock.waits == []
+
+    # The bucket is empty: one request refills every second
+    _acquire_all(limiter, [0, 0])
+    assert clock.waits == [1.0, 1.0]
+
+
+def test_tokens_per_minute_wait_for_the_missing_tokens(monkeypatch):
+    clock = _clock(monkeypatch)
+    limiter = TokenBucketLimiter(tokens_per_minute=600)
+
+    _acquire_all(limiter, [500])
+    assert clock.waits == []
+
+    # 100 tokens left, 200 more refill in 20 seconds
+    _acquire_all(limiter, [300])
+    assert clock.waits == [20.0]
+
+
+def test_wait_covers_the_slower_bucket(monkeypatch):
+    clock = _clock(monkeypatch)
+    limiter = TokenBucketLimiter(requests_per_minute=1, tokens_per_minute=6000)
+
+    _acquire_all(limiter, [100, 100])
+    assert clock.waits == [60.0]
+
+
+def test_request_larger_than_a_minute_of_tokens_is_clamped(monkeypatch):
+    clock = _clock(monkeypatch)
+    limiter = TokenBucketLimiter(tokens_per_minute=600)
+
+    _acquire_all(limiter, [5000, 5000])
+    assert clock.waits == [60.0]
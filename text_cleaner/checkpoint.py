@@ -0,0 +1,79 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+class CheckpointStore:
+    """
+    Persists per-chunk stage results in SQLite so interrupted runs can resume.
+
+    Each record is keyed by the chunk's source file, chunk id and a hash of
+    its text, plus the stage that produced it. Stage names include
+    whatever configuration the result depends on (for scoring: provider,
+    model, prompt version and mode), so changing it invalidates the records.
+    Rerunning the pipeline on the same input finds these records and skips
+    the work.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "chunk_key TEXT NOT NULL, stage TEXT NOT NULL, record TEXT NOT NULL, "
+            "PRIMARY KEY (chunk_key, stage))"
+        )
+        self._conn.commit()
+
+        count = self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        logging.info(f"Checkpoint store: {self.path} ({count} records)")
+
+    @staticmethod
+    def chunk_key(chunk: Dict) -> str:
+        """
+        Returns the key identifying a chunk across runs.
+
+        The positional `doc_id` is left out: it shifts when files are added
+        or removed, or when the chunk count is not known up front.
+        """
+        text_hash = hashlib.sha256(chunk['text'].encode('utf-8')).hexdigest()
+        identity = "|".join([
+            chunk.get('doc_source_path', ''),
+            str(chunk.get('chunk_id', '')),
+            text_hash
+        ])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def get(self, chunk: Dict, stage: str) -> Optional[Dict]:
+        """
+        Returns the recorded output of `stage` for a chunk, if any.
+        """
+        row = self._conn.execute(
+            "SELECT record FROM checkpoints WHERE chunk_key = ? AND stage = ?",
+            (self.chunk_key(chunk), stage)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, stage: str, records: Iterable[tuple]):
+        """
+        Records the output of `stage` for several chunks and commits.
+
+        Args:
+            stage: Name of the stage that produced the records.
+            records: (chunk, record) pairs, where `record` is the dict of
+                fields the stage added to the chunk.
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO checkpoints (chunk_key, stage, record) VALUES (?, ?, ?)",
+            [
+                (self.chunk_key(chunk), stage, json.dumps(record, ensure_ascii=False))
+                for chunk, record in records
+            ]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
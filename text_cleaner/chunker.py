@@ -1,11 +1,16 @@
 import logging
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional
 from indicnlp import common
 from indicnlp.tokenize import sentence_tokenize
+from .cleaning import compute_text_stats
 
 INDIC_NLP_RESOURCES_DIR = "indic_nlp_resources"
 common.set_resources_path(INDIC_NLP_RESOURCES_DIR)
 
+# Zero-padding used for doc_id when the number of documents is not known
+# up front (e.g. when documents are streamed from a generator).
+STREAM_DOC_ID_WIDTH = 6
+
 
 def _semantic_chunking(text: str, target_size: int) -> List[str]:
     """
@@ -60,16 +65,22 @@ def _semantic_chunking(text: str, target_size: int) -> List[str]:
     return chunks
 
 
-def chunk_documents(documents: List[Dict], config: Dict) -> List[Dict]:
+def iter_chunks(documents: Iterable[Dict], config: Dict, total_docs: Optional[int] = None) -> Iterator[Dict]:
     """
-    Chunk documents according to config settings and add comprehensive metadata.
+    Lazily chunk documents according to config settings and add comprehensive
+    metadata. Chunks are yielded as soon as their source document is split.
+    Documents already carrying a `discard_reason` are yielded whole.
+
+    `total_docs` sizes the doc_id padding; when the count is unknown (streamed
+    input) a fixed width is used.
     """
     chunking_config = config.get('chunking', {})
+    if total_docs is None and hasattr(documents, '__len__'):
+        total_docs = len(documents)
+    doc_id_width = len(str(total_docs)) if total_docs is not None else STREAM_DOC_ID_WIDTH
     
     if not chunking_config.get('enabled', True):
         logging.info("Chunking disabled, keeping documents as-is")
-        total_docs = len(documents)
-        doc_id_width = len(str(total_docs))
         
         for doc_index, doc in enumerate(documents, start=1):
             doc['doc_id'] = f"{doc_index:0{doc_id_width}d}"
@@ -77,45 +88,69 @@ def chunk_documents(documents: List[Dict], config: Dict) -> List[Dict]:
             doc['doc_source_path'] = doc.get('filepath', '')
             doc['total_chunks'] = 1
             doc['chunk_id'] = 1
+            doc['text_stats'] = compute_text_stats(doc['text'])._asdict()
+            yield doc
         
-        return documents
+        return
     
     target_size = chunking_config.get('target_size', 5000)
     
     logging.info(f"Semantic chunking enabled with target size: {target_size} words")
     
-    chunked_documents = []
-    total_docs = len(documents)
-    doc_id_width = len(str(total_docs))
+    total_docs = 0
+    total_chunks = 0
     
     for doc_index, doc in enumerate(documents, start=1):
         doc_id = f"{doc_index:0{doc_id_width}d}"
-
-        chunks = _semantic_chunking(doc['text'], target_size)
-        
         doc_name = doc.get('filename', f'document_{doc_id}')
         doc_source_path = doc.get('filepath', '')
-        
-        for chunk_index, chunk_text in enumerate(chunks, start=1):
-            chunked_documents.append({
+
+        if 'discard_reason' in doc:
+            # Documents discarded before chunking are passed on whole
+            yield {
                 'doc_id': doc_id,
                 'doc_name': doc_name,
                 'doc_source_path': doc_source_path,
-                'total_chunks': len(chunks),
-                'chunk_id': chunk_index,
-                'text': chunk_text
-            })
+                'total_chunks': 1,
+                'chunk_id': 1,
+                'text': doc['text'],
+                'discard_reason': doc['discard_reason'],
+                'discard_stage': doc['discard_stage']
+            }
+            continue
+
+        chunks = _semantic_chunking(doc['text'], target_size)
         
-        total_words = sum(len(chunk.split()) for chunk in chunks)
+        chunk_stats = [compute_text_stats(chunk) for chunk in chunks]
+        total_words = sum(stats.word_count for stats in chunk_stats)
         avg_words = total_words // len(chunks) if chunks else 0
         
         logging.info(
             f"  ✓ {doc_name}: {len(chunks)} chunks "
             f"(~{avg_words} words/chunk)"
         )
+        
+        total_docs += 1
+        total_chunks += len(chunks)
+        
+        for chunk_index, (chunk_text, stats) in enumerate(zip(chunks, chunk_stats), start=1):
+            yield {
+                'doc_id': doc_id,
+                'doc_name': doc_name,
+                'doc_source_path': doc_source_path,
+                'total_chunks': len(chunks),
+                'chunk_id': chunk_index,
+                'text': chunk_text,
+                'text_stats': stats._asdict()
+            }
     
     logging.info(
-        f"Chunking complete: {total_docs} documents → {len(chunked_documents)} chunks\n"
+        f"Chunking complete: {total_docs} documents → {total_chunks} chunks\n"
     )
-    
-    return chunked_documents
\ No newline at end of file
+
+
+def chunk_documents(documents: List[Dict], config: Dict) -> List[Dict]:
+    """
+    Chunk documents according to config settings and add comprehensive metadata.
+    """
+    return list(iter_chunks(documents, config))
@@ -1,4 +1,10 @@
 import re
+from typing import Dict, List, NamedTuple, Tuple
+
+# UTF-8 lead byte pairs of the Malayalam block: U+0D00-U+0D3F encode as
+# E0 B4 xx and U+0D40-U+0D7F as E0 B5 xx. Neither pair can occur inside any
+# other character's encoding, so counting them counts Malayalam characters.
+_MALAYALAM_UTF8_PREFIXES = (b'\xe0\xb4', b'\xe0\xb5')
 
 def remove_tags(text: str) -> str:
     """
@@ -40,6 +46,66 @@ def remove_repeated_title(text: str, title: str) -> str:
         return text.split('\n', 1)[1] if '\n' in text else ""
     return text
 
+class TextStats(NamedTuple):
+    """
+    Quality statistics of a text, computed once and reused by every filter.
+    """
+    non_space_chars: int
+    malayalam_chars: int
+    word_count: int
+    line_count: int
+
+    @property
+    def malayalam_ratio(self) -> float:
+        """
+        Ratio of Malayalam characters among non-whitespace characters.
+        """
+        if self.non_space_chars == 0:
+            return 0.0
+        return self.malayalam_chars / self.non_space_chars
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TextStats':
+        return cls(**{field: data[field] for field in cls._fields})
+
+def compute_text_stats(text: str) -> TextStats:
+    """
+    Computes the quality statistics of a text in a single pass.
+
+    Word and non-whitespace character counts come from one `split()` and
+    the Malayalam character count from one UTF-8 byte count, instead of a
+    Python-level loop over every character.
+    """
+    words = text.split()
+    non_space_chars = sum(map(len, words))
+    if non_space_chars:
+        encoded = text.encode('utf-8', 'surrogatepass')
+        malayalam_chars = sum(encoded.count(prefix) for prefix in _MALAYALAM_UTF8_PREFIXES)
+    else:
+        malayalam_chars = 0
+    line_count = text.count('\n') + 1 if text else 0
+    return TextStats(non_space_chars, malayalam_chars, len(words), line_count)
+
+def filter_batch(stats: List[TextStats], threshold: float = 0.8, min_words: int = 5) -> Tuple[List[bool], List[bool]]:
+    """
+    Applies the Malayalam ratio and word count filters to a batch of
+    precomputed text statistics.
+
+    Args:
+        stats: Statistics of the texts to check (see `compute_text_stats`).
+        threshold: The minimum required ratio of Malayalam characters (0.0 to 1.0).
+        min_words: The minimum number of words required.
+
+    Returns:
+        Two parallel lists: ratio pass/fail and word count pass/fail.
+    """
+    passes_ratio = [
+        item.non_space_chars > 0 and item.malayalam_ratio >= threshold
+        for item in stats
+    ]
+    passes_count = [item.word_count >= min_words for item in stats]
+    return passes_ratio, passes_count
+
 def filter_by_ratio(text: str, threshold: float = 0.8) -> bool:
     """
     Checks if the ratio of Malayalam characters in the text is above a threshold.
@@ -53,23 +119,9 @@ def filter_by_ratio(text: str, threshold: float = 0.8) -> bool:
     """
     if not text:
         return False
-    
-    # The Unicode range for Malayalam characters is U+0D00 to U+0D7F
-    malayalam_chars = 0
-    total_chars = 0
-    
-    for char in text:
-        # Ignore spaces and newlines when calculating the ratio
-        if not char.isspace():
-            total_chars += 1
-            if '\u0D00' <= char <= '\u0D7F':
-                malayalam_chars += 1
-    
-    if total_chars == 0:
-        return False
-        
-    ratio = malayalam_chars / total_chars
-    return ratio >= threshold
+
+    stats = compute_text_stats(text)
+    return stats.non_space_chars > 0 and stats.malayalam_ratio >= threshold
 
 def filter_by_count(text: str, min_words: int = 5) -> bool:
     """
@@ -97,4 +149,60 @@ def strict_mal_char(text: str) -> str:
     - Common punctuation (. , ? ! -)
     """
 
-    return re.sub(r'[^\u0D00-\u0D7F\s\d.,?!-]', '', text)
\ No newline at end of file
+    return re.sub(r'[^\u0D00-\u0D7F\s\d.,?!-]', '', text)
+
+class CleaningEngine:
+    """
+    Applies the Stage 1 cleaning chain with precompiled patterns.
+
+    Produces exactly the same output as calling `remove_wiki_markup`,
+    `remove_repeated_title`, `remove_tags`, `strict_mal_char` (when
+    aggressive removal is enabled) and `remove_extra_whitespace` in turn,
+    but with fewer full-text scans and copies:
+
+    - Patterns are compiled once per engine instead of on every call.
+    - Every pass is skipped when its trigger substring (`[[`, `=`, `<`,
+      a double newline, a tab or a double space) is absent.
+    - Whitespace patterns start with a literal run (`\n\n`, two spaces),
+      which the regex engine can search for quickly, instead of matching
+      every single space. Tabs are folded into spaces with `str.replace`.
+
+    Wiki links and tags are deliberately kept as separate passes: an
+    alternation of the two is slower than two literal-prefix searches.
+    """
+
+    _WIKI_LINK = re.compile(r'\[\[.*?\]\]')
+    _DOUBLE_HEADING = re.compile(r'==([^=]+)==')
+    _SINGLE_HEADING = re.compile(r'=([^=]+)=')
+    _TAG = re.compile(r'<[^>]*?>')
+    _STRICT_CHARS = re.compile(r'[^\u0D00-\u0D7F\s\d.,?!-]')
+    _NEWLINE_RUN = re.compile(r'\n\n+')
+    _SPACE_RUN = re.compile(r'  +')
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.aggressive = config.get('use_aggressive_char_removal', False)
+
+    def clean(self, text: str, title: str = '') -> str:
+        """
+        Cleans a document's text, equivalent to the Stage 1 function chain.
+        """
+        if '[[' in text:
+            text = self._WIKI_LINK.sub('', text)
+        if '=' in text:
+            text = self._DOUBLE_HEADING.sub(r'\1', text)
+            text = self._SINGLE_HEADING.sub(r'\1', text)
+        text = remove_repeated_title(text, title)
+        if '<' in text:
+            text = self._TAG.sub('', text)
+        if self.aggressive:
+            text = self._STRICT_CHARS.sub('', text)
+
+        text = text.strip()
+        if '\n\n' in text:
+            text = self._NEWLINE_RUN.sub('\n', text)
+        if '\t' in text:
+            text = text.replace('\t', ' ')
+        if '  ' in text:
+            text = self._SPACE_RUN.sub(' ', text)
+        return text
@@ -0,0 +1,514 @@
+import hashlib
+import logging
+import math
+import os
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+
+# MinHash permutations are (a * h + b) mod p over 32-bit shingle hashes
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def digest64(data: bytes) -> int:
+    """
+    Returns a nonzero 64-bit BLAKE2b digest of `data`.
+    """
+    value = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class DigestSet:
+    """
+    Open-addressing hash set of nonzero 64-bit digests.
+
+    Digests live in a flat `array('Q')` buffer with linear probing, so each
+    entry costs 8 bytes per slot instead of the ~100 bytes of a hex string
+    in a Python set. The table doubles when it is half full.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        self._keys = array('Q', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return (key for key in self._keys if key)
+
+    def __contains__(self, key: int) -> bool:
+        return self._keys[self._slot(key)] != 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._keys) * 8
+
+    def _slot(self, key: int) -> int:
+        keys, mask = self._keys, self._mask
+        slot = key & mask
+        while True:
+            existing = keys[slot]
+            if existing == 0 or existing == key:
+                return slot
+            slot = (slot + 1) & mask
+
+    def add(self, key: int) -> bool:
+        """
+        Adds `key`; returns False if it was already present.
+        """
+        slot = self._slot(key)
+        if self._keys[slot]:
+            return False
+
+        self._keys[slot] = key
+        self._inserted(slot)
+        return True
+
+    def _inserted(self, slot: int):
+        self.size += 1
+        if self.size * 2 > len(self._keys):
+            self._grow()
+
+    def _resize(self) -> array:
+        old_keys = self._keys
+        capacity = len(old_keys) * 2
+        self._keys = array('Q', bytes(8 * capacity))
+        self._mask = capacity - 1
+        return old_keys
+
+    def _grow(self):
+        for key in self._resize():
+            if key:
+                self._keys[self._slot(key)] = key
+
+    def clear(self):
+        self._keys = array('Q', bytes(8 * len(self._keys)))
+        self.size = 0
+
+
+class DigestMap(DigestSet):
+    """
+    Open-addressing hash table from nonzero 64-bit digests to 64-bit values,
+    stored in a second `array('Q')` alongside the keys (16 bytes per slot).
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        super().__init__(capacity)
+        self._values = array('Q', bytes(8 * len(self._keys)))
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self._keys) + len(self._values)) * 8
+
+    def get(self, key: int) -> Optional[int]:
+        slot = self._slot(key)
+        return self._values[slot] if self._keys[slot] else None
+
+    def setdefault(self, key: int, value: int) -> int:
+        """
+        Stores `value` under `key` unless present; returns the stored value.
+        """
+        slot = self._slot(key)
+        if self._keys[slot]:
+            return self._values[slot]
+
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._inserted(slot)
+        return value
+
+    def increment(self, key: int, amount: int = 1) -> int:
+        """
+        Adds `amount` to the value under `key` (starting from 0); returns the
+        new value.
+        """
+        slot = self._slot(key)
+        if self._keys[slot]:
+            self._values[slot] += amount
+            return self._values[slot]
+
+        self._keys[slot] = key
+        self._values[slot] = amount
+        self._inserted(slot)
+        return amount
+
+    def sorted_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the keys in ascending order and their values, as new arrays.
+        """
+        keys = np.frombuffer(self._keys, dtype=np.uint64)
+        occupied = keys != 0
+        keys = keys[occupied]
+        values = np.frombuffer(self._values, dtype=np.uint64)[occupied]
+        order = np.argsort(keys)
+        return keys[order], values[order]
+
+    def _grow(self):
+        old_values = self._values
+        old_keys = self._resize()
+        self._values = array('Q', bytes(8 * len(self._keys)))
+        for key, value in zip(old_keys, old_values):
+            if key:
+                slot = self._slot(key)
+                self._keys[slot] = key
+                self._values[slot] = value
+
+    def clear(self):
+        super().clear()
+        self._values = array('Q', bytes(8 * len(self._keys)))
+
+
+class BloomFilter:
+    """
+    Bloom filter over 64-bit digests, sized for `capacity` items at a target
+    false positive rate. Bit positions come from double hashing the two
+    32-bit halves of the digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def _positions(self, key: int) -> Iterator[int]:
+        low, high = key & 0xFFFFFFFF, (key >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (low + i * high) % self.num_bits
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add_many(self, keys: np.ndarray, block_size: int = 1 << 20):
+        """
+        Adds an array of digests, vectorized in blocks (same positions as `add`).
+        """
+        bits = np.frombuffer(self._bits, dtype=np.uint8)
+        for start in range(0, len(keys), block_size):
+            block = np.asarray(keys[start:start + block_size], dtype=np.uint64)
+            low = block & np.uint64(0xFFFFFFFF)
+            high = (block >> np.uint64(32)) | np.uint64(1)
+            for i in range(self.num_hashes):
+                positions = (low + np.uint64(i) * high) % np.uint64(self.num_bits)
+                np.bitwise_or.at(
+                    bits,
+                    (positions >> np.uint64(3)).astype(np.intp),
+                    np.left_shift(1, positions & np.uint64(7)).astype(np.uint8)
+                )
+
+
+class DigestIndex:
+    """
+    Memory-compact set of seen texts for exact deduplication at scale.
+
+    Texts are reduced to 64-bit BLAKE2b digests (a collision among 50M
+    texts has a probability below 1e-4) and kept in a `DigestSet`.
+
+    Optionally:
+    - `bloom_error_rate` puts a Bloom filter sized for `expected_items` in
+      front, so most new texts are recognized without probing the table or
+      any spilled runs.
+    - `max_memory_items` bounds the in-memory table: when it fills, its
+      digests are sorted and spilled to a `.npy` run in `spill_dir` (a
+      temporary directory by default), which is memory-mapped and searched
+      by bisection.
+
+    `save()` writes every digest to one sorted `.npy` file and `load()`
+    memory-maps it as a read-only run, so an index can be shared across runs.
+    """
+
+    def __init__(self, expected_items: int = 1_000_000, bloom_error_rate: Optional[float] = None,
+                 max_memory_items: Optional[int] = None, spill_dir: Optional[Union[str, Path]] = None):
+        self.expected_items = expected_items
+        self.bloom_error_rate = bloom_error_rate
+        self.max_memory_items = max_memory_items
+        self._table = DigestSet(min(expected_items, max_memory_items or expected_items) * 2)
+        self._bloom = BloomFilter(expected_items, bloom_error_rate) if bloom_error_rate else None
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._temp_dir = None
+        self._runs = []
+        self._run_items = 0
+
+    def __len__(self) -> int:
+        return len(self._table) + self._run_items
+
+    @property
+    def nbytes(self) -> int:
+        """
+        In-memory size of the table and Bloom filter (spilled runs excluded).
+        """
+        return self._table.nbytes + (self._bloom.nbytes if self._bloom is not None else 0)
+
+    def _in_runs(self, key: int) -> bool:
+        needle = np.uint64(key)
+        for run in self._runs:
+            position = np.searchsorted(run, needle)
+            if position < len(run) and run[position] == needle:
+                return True
+        return False
+
+    def __contains__(self, key: int) -> bool:
+        if self._bloom is not None and key not in self._bloom:
+            return False
+        return key in self._table or self._in_runs(key)
+
+    def add(self, key: int) -> bool:
+        """
+        Adds a digest; returns False if it was already in the index.
+        """
+        if key in self:
+            return False
+        if self._bloom is not None:
+            self._bloom.add(key)
+        self._table.add(key)
+        if self.max_memory_items and len(self._table) >= self.max_memory_items:
+            self._spill()
+        return True
+
+    def add_text(self, text: str) -> bool:
+        """
+        Adds a text's digest; returns False if the text was seen before.
+        """
+        return self.add(digest64(text.encode('utf-8')))
+
+    def _spill(self):
+        if self._spill_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='dedup_index_')
+            self._spill_dir = Path(self._temp_dir.name)
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+
+        run_path = self._spill_dir / f"run_{len(self._runs):05d}.npy"
+        np.save(run_path, np.sort(np.fromiter(self._table, dtype=np.uint64, count=len(self._table))))
+        self._runs.append(np.load(run_path, mmap_mode='r'))
+        self._run_items += len(self._table)
+        logging.info(f"Dedup index: spilled {len(self._table)} digests to {run_path}")
+        self._table.clear()
+
+    def _sorted_digests(self) -> np.ndarray:
+        parts = [np.fromiter(self._table, dtype=np.uint64, count=len(self._table))]
+        parts.extend(np.asarray(run) for run in self._runs)
+        return np.unique(np.concatenate(parts))
+
+    def save(self, path: Union[str, Path]):
+        """
+        Writes all digests to a sorted `.npy` file, atomically replacing it.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            np.save(f, self._sorted_digests())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], **kwargs) -> 'DigestIndex':
+        """
+        Opens an index saved with `save()`; new digests go to memory on top of
+        the memory-mapped saved ones.
+        """
+        index = cls(**kwargs)
+        run = np.load(Path(path), mmap_mode='r')
+        index._runs.append(run)
+        index._run_items += len(run)
+        if index._bloom is not None:
+            index._bloom = BloomFilter(len(run) + index.expected_items, index.bloom_error_rate)
+            index._bloom.add_many(run)
+        return index
+
+    def close(self):
+        """
+        Releases spilled runs and removes the temporary spill directory.
+        """
+        self._runs = []
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+
+def _false_positive_area(threshold: float, bands: int, rows: int, steps: int = 100) -> float:
+    width = threshold / steps
+    return sum(
+        1 - (1 - ((i + 0.5) * width) ** rows) ** bands for i in range(steps)
+    ) * width
+
+
+def _false_negative_area(threshold: float, bands: int, rows: int, steps: int = 100) -> float:
+    width = (1 - threshold) / steps
+    return sum(
+        (1 - (threshold + (i + 0.5) * width) ** rows) ** bands for i in range(steps)
+    ) * width
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Returns the (bands, rows) split of `num_perm` MinHash values whose LSH
+    collision curve best separates pairs above and below `threshold`,
+    weighting false positives and false negatives equally.
+    """
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            error = (
+                _false_positive_area(threshold, bands, rows)
+                + _false_negative_area(threshold, bands, rows)
+            )
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+def shingles(text: str, kind: str = 'word', size: int = 5) -> List[str]:
+    """
+    Splits whitespace-normalized text into overlapping word or character
+    shingles. Texts shorter than one shingle become a single shingle.
+    """
+    if kind == 'char':
+        units = ' '.join(text.split())
+        joiner = ''
+    else:
+        units = text.split()
+        joiner = ' '
+    if len(units) <= size:
+        return [joiner.join(units)]
+    return [joiner.join(units[i:i + size]) for i in range(len(units) - size + 1)]
+
+
+class MinHashLSH:
+    """
+    Streaming near-duplicate detector using MinHash signatures and
+    locality-sensitive hashing.
+
+    Each text gets a `num_perm`-value MinHash signature over its shingles,
+    split into bands. Two texts whose estimated Jaccard similarity is above
+    `threshold` very likely share at least one identical band. Only the band
+    digests of texts kept so far are stored (no signatures or texts), in a
+    `DigestMap` of 16-byte slots that is between a quarter and half full:
+    32-64 bytes per band, so 290-580 bytes per kept text at 9 bands (the
+    bands of threshold 0.8 with 128 permutations).
+
+    `max_memory_items` bounds the in-memory table: when it holds that many
+    band entries, they are sorted and spilled with their cluster ids to a
+    pair of `.npy` runs in `spill_dir` (a temporary directory by default),
+    which are memory-mapped and searched by bisection.
+
+    A text matching an earlier one is reported with the cluster id of that
+    earlier text: the hex digest of its content.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle: str = 'word',
+                 shingle_size: int = 5, seed: int = 1, max_memory_items: Optional[int] = None,
+                 spill_dir: Optional[Union[str, Path]] = None):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.max_memory_items = max_memory_items
+        self._index = DigestMap()
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._temp_dir = None
+        self._runs = []
+        self._run_items = 0
+
+        logging.info(
+            f"Near-duplicate detection: Jaccard >= {threshold}, {num_perm} permutations "
+            f"({self.bands} bands x {self.rows} rows), {shingle_size}-{shingle} shingles"
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Returns the MinHash signature of a text as `num_perm` 32-bit values.
+        """
+        hashes = np.frombuffer(b''.join(
+            hashlib.blake2b(item.encode('utf-8'), digest_size=4).digest()
+            for item in set(shingles(text, self.shingle, self.shingle_size))
+        ), dtype='<u4').astype(np.uint64)
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return [
+            digest64(band.to_bytes(2, 'little') + signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _lookup(self, key: int) -> Optional[int]:
+        cluster = self._index.get(key)
+        if cluster is not None:
+            return cluster
+
+        needle = np.uint64(key)
+        for keys, clusters in self._runs:
+            position = np.searchsorted(keys, needle)
+            if position < len(keys) and keys[position] == needle:
+                return int(clusters[position])
+        return None
+
+    def add(self, text: str) -> Optional[str]:
+        """
+        Returns the cluster id of an earlier near-duplicate of `text`, or
+        registers `text` as a new cluster and returns None.
+        """
+        band_keys = self._band_keys(self.signature(text))
+        for key in band_keys:
+            cluster = self._lookup(key)
+            if cluster is not None:
+                return f"{cluster:016x}"
+
+        cluster = digest64(text.encode('utf-8'))
+        for key in band_keys:
+            self._index.setdefault(key, cluster)
+        if self.max_memory_items and len(self._index) >= self.max_memory_items:
+            self._spill()
+        return None
+
+    def _spill(self):
+        if self._spill_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='lsh_index_')
+            self._spill_dir = Path(self._temp_dir.name)
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+
+        keys, clusters = self._index.sorted_arrays()
+        run_path = self._spill_dir / f"lsh_run_{len(self._runs):05d}"
+        np.save(f"{run_path}_keys.npy", keys)
+        np.save(f"{run_path}_clusters.npy", clusters)
+        self._runs.append((
+            np.load(f"{run_path}_keys.npy", mmap_mode='r'),
+            np.load(f"{run_path}_clusters.npy", mmap_mode='r')
+        ))
+        self._run_items += len(keys)
+        logging.info(f"Near-duplicate index: spilled {len(keys)} band entries to {run_path}_*.npy")
+        self._index.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Band entries in total and the in-memory size (spilled runs excluded).
+        """
+        return {'entries': len(self._index) + self._run_items, 'bytes': self._index.nbytes}
+
+    def close(self):
+        """
+        Releases spilled runs and removes the temporary spill directory.
+        """
+        self._runs = []
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
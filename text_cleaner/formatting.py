@@ -1,24 +1,61 @@
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import Iterable, Dict, Union
 
-def save_to_jsonl(documents: List[Dict[str, str]], output_path: Union[str, Path]):
+class JsonlWriter:
     """
-    Saves a list of documents to a JSON Lines (.jsonl) file.
+    Writes documents to a JSON Lines (.jsonl) file one record at a time.
+
+    Records are written as soon as they arrive, so a streaming pipeline
+    never has to hold its output in memory. With `lazy=True` the file is
+    only created once the first record is written.
+    """
+
+    def __init__(self, output_path: Union[str, Path], lazy: bool = False):
+        self.output_path = Path(output_path)
+        self.lazy = lazy
+        self.count = 0
+        self._file = None
+
+    def _open(self):
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        logging.info(f"Saving data to: {self.output_path}")
+        self._file = open(self.output_path, 'w', encoding='utf-8')
+
+    def __enter__(self):
+        if not self.lazy:
+            self._open()
+        return self
+
+    def write(self, doc: Dict):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(doc, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def save_to_jsonl(documents: Iterable[Dict[str, str]], output_path: Union[str, Path]):
     """
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    Saves documents to a JSON Lines (.jsonl) file.
 
-    logging.info(f"Saving data to: {output_path}")
-    
+    Accepts any iterable, so generators are written record by record
+    without being materialized first.
+    """
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with JsonlWriter(output_path) as writer:
             for doc in documents:
-                json_record = json.dumps(doc, ensure_ascii=False)
-                f.write(json_record + '\n')
-        
-        logging.info(f"Successfully saved {len(documents)} documents.\n")
-    
+                writer.write(doc)
+
+        logging.info(f"Successfully saved {writer.count} documents.\n")
+
     except Exception as e:
-        logging.error(f"Could not save file. {e}")
\ No newline at end of file
+        logging.error(f"Could not save file. {e}")
@@ -0,0 +1,166 @@
+import logging
+import math
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+# Characters that end a sentence at the end of a line
+_SENTENCE_ENDINGS = ('.', '?', '!', '।', '॥', ':')
+
+_BOUNDARY = '\x02'
+
+
+class CharNgramModel:
+    """
+    Character n-gram language model with add-k smoothing.
+
+    Trained on a reference Malayalam text, its perplexity on a chunk is low
+    for fluent prose in the same language and high for broken text, other
+    scripts or random character sequences.
+    """
+
+    def __init__(self, order: int = 3, k: float = 0.1):
+        self.order = order
+        self.k = k
+        self.ngrams = Counter()
+        self.contexts = Counter()
+        self.vocabulary = set()
+
+    def _padded(self, text: str) -> str:
+        return _BOUNDARY * (self.order - 1) + ' '.join(text.split())
+
+    def fit(self, text: str) -> 'CharNgramModel':
+        """
+        Adds the n-gram counts of `text` to the model.
+        """
+        padded = self._padded(text)
+        self.vocabulary.update(padded)
+        for i in range(self.order - 1, len(padded)):
+            ngram = padded[i - self.order + 1:i + 1]
+            self.ngrams[ngram] += 1
+            self.contexts[ngram[:-1]] += 1
+        return self
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], order: int = 3, k: float = 0.1) -> 'CharNgramModel':
+        """
+        Trains a model on a UTF-8 reference text file, line by line.
+        """
+        model = cls(order, k)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    model.fit(line)
+        logging.info(f"Heuristic reference model: {path} ({len(model.ngrams)} {order}-grams)")
+        return model
+
+    def perplexity(self, text: str) -> float:
+        """
+        Returns the per-character perplexity of `text` under the model.
+        """
+        padded = self._padded(text)
+        vocabulary_size = len(self.vocabulary) + 1
+        log_prob = 0.0
+        count = 0
+        for i in range(self.order - 1, len(padded)):
+            ngram = padded[i - self.order + 1:i + 1]
+            log_prob += math.log(
+                (self.ngrams[ngram] + self.k) / (self.contexts[ngram[:-1]] + self.k * vocabulary_size)
+            )
+            count += 1
+        if count == 0:
+            return float('inf')
+        return math.exp(-log_prob / count)
+
+
+def compute_features(text: str, model: Optional[CharNgramModel] = None, short_line_words: int = 4) -> Dict[str, float]:
+    """
+    Computes the heuristic quality features of a text.
+
+    - repeated_line_ratio: share of non-empty lines that repeat an earlier line
+    - repeated_ngram_ratio: share of word trigrams that repeat an earlier one
+    - short_line_ratio: share of lines with fewer than `short_line_words` words
+    - sentence_end_ratio: share of lines ending with sentence punctuation
+    - symbol_ratio: share of non-whitespace characters that are punctuation,
+      digits or symbols
+    - perplexity: character n-gram perplexity (only with a reference model)
+    """
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    words = text.split()
+    trigrams = [tuple(words[i:i + 3]) for i in range(len(words) - 2)]
+    non_space_chars = sum(map(len, words))
+    # A high share of punctuation, digits and symbols marks lists, tables,
+    # references and other non-prose content
+    symbol_chars = sum(
+        1 for ch in text if unicodedata.category(ch)[0] in 'PS' or ch.isdigit()
+    )
+
+    features = {
+        'repeated_line_ratio': 1 - len(set(lines)) / len(lines) if lines else 0.0,
+        'repeated_ngram_ratio': 1 - len(set(trigrams)) / len(trigrams) if trigrams else 0.0,
+        'short_line_ratio': (
+            sum(len(line.split()) < short_line_words for line in lines) / len(lines) if lines else 0.0
+        ),
+        'sentence_end_ratio': (
+            sum(line.endswith(_SENTENCE_ENDINGS) for line in lines) / len(lines) if lines else 0.0
+        ),
+        'symbol_ratio': symbol_chars / non_space_chars if non_space_chars else 0.0,
+    }
+    if model is not None:
+        features['perplexity'] = model.perplexity(text)
+    return {name: round(value, 4) for name, value in features.items()}
+
+
+def _check_band(features: Dict[str, float], limits: Dict) -> Optional[str]:
+    """
+    Returns the first feature that violates a band's `max_*`/`min_*` limits,
+    or None if all limits hold. Limits on missing features are skipped.
+    """
+    for name, limit in limits.items():
+        if limit is None:
+            continue
+        bound, _, feature = name.partition('_')
+        value = features.get(feature)
+        if value is None:
+            continue
+        if (bound == 'max' and value > limit) or (bound == 'min' and value < limit):
+            return feature
+    return None
+
+
+def classify(features: Dict[str, float], heuristics_config: Dict) -> Tuple[str, Optional[str]]:
+    """
+    Decides whether a chunk can skip LLM scoring.
+
+    Returns ('reject', feature) if any reject limit is exceeded,
+    ('accept', None) if every accept limit holds, and ('uncertain', None)
+    otherwise, in which case the chunk is forwarded to the LLM.
+
+    Without a perplexity feature (no reference model) nothing is
+    auto-accepted: the other features cannot tell fluent prose from
+    incoherent text, so only the LLM may accept it.
+    """
+    rejected_by = _check_band(features, heuristics_config.get('reject', {}))
+    if rejected_by:
+        return 'reject', rejected_by
+
+    accept_limits = heuristics_config.get('accept', {})
+    if accept_limits and 'perplexity' in features and _check_band(features, accept_limits) is None:
+        return 'accept', None
+    return 'uncertain', None
+
+
+def load_reference_model(heuristics_config: Dict) -> Optional[CharNgramModel]:
+    """
+    Trains the character n-gram model on `reference_path`, if configured.
+    """
+    reference_path = heuristics_config.get('reference_path')
+    if not reference_path:
+        logging.info("Heuristic pre-scoring: no reference text, perplexity checks and auto-accept disabled")
+        return None
+    return CharNgramModel.from_file(
+        reference_path,
+        order=heuristics_config.get('ngram_order', 3),
+        k=heuristics_config.get('smoothing', 0.1)
+    )
@@ -1,10 +1,211 @@
+import bz2
 import docx
+import gzip
+import html
+import io
+import json
+import lzma
 import markdown
 import logging
+import mmap
+import os
+import re
+import time
+from fnmatch import fnmatch
+from functools import partial
+from itertools import groupby
+from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 from bs4 import BeautifulSoup
 
+_DOC_OPEN = re.compile(r'<doc\b([^>]*)>', re.IGNORECASE)
+_DOC_CLOSE = re.compile(r'</doc\s*>', re.IGNORECASE)
+_ATTRIBUTE = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+# The same boundaries as bytes, for scanning memory-mapped files
+_DOC_OPEN_BYTES = re.compile(rb'<doc\b([^>]*)>', re.IGNORECASE)
+_DOC_CLOSE_BYTES = re.compile(rb'</doc\s*>', re.IGNORECASE)
+# A tag, closing tag, comment or declaration start: text needing an HTML parser
+_MARKUP = re.compile(r'<[A-Za-z/!?]')
+
+# Characters read from a file per step of the streaming <doc> scanner
+_READ_SIZE = 1 << 20
+
+# Bytes of a memory-mapped file scanned before its pages are released
+_RELEASE_SIZE = 64 << 20
+
+# Record fields that JSONL/Parquet documents are read from, unless
+# overridden by `ingestion.field_map`
+_DEFAULT_FIELD_MAP = {'id': 'id', 'url': 'url', 'title': 'title', 'text': 'text'}
+
+def _parse_attributes(attribute_text: str) -> Dict[str, str]:
+    """
+    Parses the attributes of a <doc ...> tag, unescaping entities.
+    """
+    return {
+        match.group(1).lower(): html.unescape(next(value for value in match.groups()[1:] if value is not None))
+        for match in _ATTRIBUTE.finditer(attribute_text)
+    }
+
+def _inner_text(inner: str) -> str:
+    """
+    Returns the text of a <doc> element's content, as BeautifulSoup's
+    `get_text(strip=True)` would. Only content that actually contains
+    markup is parsed; plain text is just unescaped.
+    """
+    if _MARKUP.search(inner):
+        return BeautifulSoup(inner, 'html.parser').get_text(strip=True)
+    return html.unescape(inner).strip()
+
+def _element_doc(attributes: Dict[str, str], inner: str, file_path: Path) -> Optional[Dict[str, str]]:
+    """
+    Builds the document for one <doc> element, or None if it lacks an id,
+    a title or text.
+    """
+    doc_id = attributes.get('id')
+    doc_title = attributes.get('title')
+    doc_text = _inner_text(inner)
+
+    if not (doc_id and doc_title and doc_text):
+        return None
+    return {
+        'id': doc_id,
+        'url': attributes.get('url'),
+        'title': doc_title,
+        'text': doc_text,
+        'filename': file_path.name,
+        'filepath': str(file_path.resolve())
+    }
+
+def _whole_file_doc(text: str, file_path: Path) -> Optional[Dict[str, str]]:
+    """
+    Builds a single document from a file without <doc> tags, using the
+    file's name for metadata.
+    """
+    full_text = BeautifulSoup(text, 'html.parser').get_text(strip=True)
+    if not full_text:
+        return None
+    return {
+        'id': file_path.name,
+        'url': str(file_path.resolve()),
+        'title': file_path.stem,
+        'text': full_text,
+        'filename': file_path.name,
+        'filepath': str(file_path.resolve())
+    }
+
+def _iter_docs(stream: TextIO, file_path: Path) -> Iterator[Dict[str, str]]:
+    """
+    Streams documents out of a text stream, one at a time.
+
+    - The stream is read in blocks and scanned for <doc ...> ... </doc>
+      elements, so only the current document is held in memory.
+    - If no <doc> tags are found, the entire text is treated as a single
+      document, using the file's name for metadata.
+    """
+    buffer = ''
+    position = 0
+    found_docs = False
+
+    while True:
+        block = stream.read(_READ_SIZE)
+        buffer += block
+
+        while True:
+            opening = _DOC_OPEN.search(buffer, position)
+            if not opening:
+                break
+            closing = _DOC_CLOSE.search(buffer, opening.end())
+            if not closing and block:
+                break
+
+            # An unterminated last <doc> runs to the end of the file
+            content_end = closing.start() if closing else len(buffer)
+            found_docs = True
+            position = closing.end() if closing else len(buffer)
+            doc = _element_doc(_parse_attributes(opening.group(1)), buffer[opening.end():content_end], file_path)
+            if doc:
+                yield doc
+
+        if not block:
+            break
+        if found_docs:
+            buffer = buffer[position:]
+            position = 0
+
+    if not found_docs:
+        doc = _whole_file_doc(buffer, file_path)
+        if doc:
+            yield doc
+
+def _iter_docs_mmap(file_path: Path, span: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Streams documents out of a memory-mapped file (or the byte range `span`
+    of it, see `_mmap_spans`), one at a time.
+
+    Document boundaries are found with byte-level searches over the mapping
+    and only each document's slice is decoded from UTF-8, so files larger
+    than RAM are read without a full in-memory copy. Pages already scanned
+    are released every `_RELEASE_SIZE` bytes, so the mapping does not stay
+    resident either. Whole files without <doc> tags are decoded whole, as
+    in `_iter_docs`.
+    """
+    can_release = hasattr(mmap, 'MADV_DONTNEED')
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position, end = span or (0, len(mapped))
+        whole_file = (position, end) == (0, len(mapped))
+        released = position - position % mmap.PAGESIZE
+        found_docs = False
+
+        while True:
+            opening = _DOC_OPEN_BYTES.search(mapped, position, end)
+            if not opening:
+                break
+            closing = _DOC_CLOSE_BYTES.search(mapped, opening.end(), end)
+
+            # An unterminated last <doc> runs to the end of the file
+            content_end = closing.start() if closing else end
+            found_docs = True
+            position = closing.end() if closing else end
+            doc = _element_doc(
+                _parse_attributes(opening.group(1).decode('utf-8')),
+                mapped[opening.end():content_end].decode('utf-8'),
+                file_path
+            )
+            if doc:
+                yield doc
+
+            if can_release and position - released >= _RELEASE_SIZE:
+                release_end = position - position % mmap.PAGESIZE
+                mapped.madvise(mmap.MADV_DONTNEED, released, release_end - released)
+                released = release_end
+
+        if not found_docs and whole_file:
+            doc = _whole_file_doc(mapped[:].decode('utf-8'), file_path)
+            if doc:
+                yield doc
+
+def _mmap_spans(file_path: Path, span_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits a file into byte ranges of at least `span_size` bytes that each
+    end right after a </doc> tag, so `_iter_docs_mmap` yields the same
+    documents from the ranges in order as from the whole file.
+
+    A range ends at the first </doc> after the first <doc> that starts past
+    `span_size`: that tag closes a document (or is stray text between
+    documents), so no document straddles two ranges.
+    """
+    spans = []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = 0
+        while start < len(mapped):
+            opening = _DOC_OPEN_BYTES.search(mapped, start + span_size) if start + span_size < len(mapped) else None
+            closing = _DOC_CLOSE_BYTES.search(mapped, opening.end()) if opening else None
+            end = closing.end() if closing else len(mapped)
+            spans.append((start, end))
+            start = end
+    return spans
+
 def _extract_docs(text: str, file_path: Path) -> List[Dict[str, str]]:
     """
     Extracts documents from a given text content.
@@ -13,95 +214,442 @@ def _extract_docs(text: str, file_path: Path) -> List[Dict[str, str]]:
     - If no <doc> tags are found, it treats the entire text as a single document,
       using the file's name for metadata.
     """
-    soup = BeautifulSoup(text, 'html.parser')
-    docs_in_text = soup.find_all('doc')
-    extracted_documents = []
-
-    if docs_in_text:
-        for doc in docs_in_text:
-            doc_id = doc.get('id')
-            doc_url = doc.get('url')
-            doc_title = doc.get('title')
-            doc_text = doc.get_text(strip=True)
-
-            if doc_id and doc_title and doc_text:
-                extracted_documents.append({
-                    'id': doc_id,
-                    'url': doc_url,
-                    'title': doc_title,
-                    'text': doc_text,
-                    'filename': file_path.name,
-                    'filepath': str(file_path.resolve())
-                })
-    else:
-        full_text = soup.get_text(strip=True)
-        if full_text:
-            extracted_documents.append({
-                'id': file_path.name,
-                'url': str(file_path.resolve()),
-                'title': file_path.stem,
-                'text': full_text,
-                'filename': file_path.name,
-                'filepath': str(file_path.resolve())
-            })
-            
-    return extracted_documents
-
-def _handle_text_file(file_path: Path) -> List[Dict[str, str]]:
-    """
-    Handles .txt, .md, and extensionless files.
+    return list(_iter_docs(io.StringIO(text), file_path))
+
+def _field_map(ingestion_config: Optional[Dict]) -> Dict[str, str]:
+    return {**_DEFAULT_FIELD_MAP, **(ingestion_config or {}).get('field_map', {})}
+
+def _record_doc(record: Dict, index: int, file_path: Path, field_map: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """
+    Maps one JSONL/Parquet record onto the document shape via `field_map`.
+    Records without text are dropped; a missing id or title falls back to
+    the record's position in the file and the file's name.
+    """
+    text = record.get(field_map['text'])
+    if not isinstance(text, str) or not text.strip():
+        return None
+
+    def field(name: str) -> Optional[str]:
+        value = record.get(field_map.get(name))
+        return str(value) if value not in (None, '') else None
+
+    return {
+        'id': field('id') or f"{file_path.name}:{index}",
+        'url': field('url'),
+        'title': field('title') or file_path.stem,
+        'text': text.strip(),
+        'filename': file_path.name,
+        'filepath': str(file_path.resolve())
+    }
+
+def _iter_jsonl_records(stream: TextIO, file_path: Path, field_map: Dict[str, str]) -> Iterator[Dict[str, str]]:
+    """
+    Streams documents out of a JSONL text stream, one record per line.
+    Malformed lines are counted and skipped.
+    """
+    malformed = 0
+    for index, line in enumerate(stream):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            malformed += 1
+            continue
+        if not isinstance(record, dict):
+            malformed += 1
+            continue
+
+        doc = _record_doc(record, index, file_path, field_map)
+        if doc:
+            yield doc
+
+    if malformed:
+        logging.warning(f"Skipped {malformed} malformed lines in {file_path.name}")
+
+def _threshold_bytes(ingestion_config: Optional[Dict]) -> Optional[int]:
+    mmap_threshold_mb = (ingestion_config or {}).get('mmap_threshold_mb')
+    return None if mmap_threshold_mb is None else max(int(mmap_threshold_mb * 2**20), 1)
+
+def _is_large_file(file_path: Path, ingestion_config: Optional[Dict]) -> bool:
+    """
+    Checks whether a file reaches `mmap_threshold_mb`. Large files are
+    never collected whole: text files (memory-mapped) and Parquet files (by
+    row groups) are split into parts for the worker pool, others are
+    streamed in the main process. Compressed and Parquet files are judged
+    by their size on disk, so shard-sized dumps still go to the pool whole.
+    """
+    threshold = _threshold_bytes(ingestion_config)
+    return threshold is not None and file_path.stat().st_size >= threshold
+
+def _handle_text_file(file_path: Path, ingestion_config: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
+    """
+    Handles .txt, .md, and extensionless files, yielding documents as they
+    are parsed. Files of at least `mmap_threshold_mb` are memory-mapped
+    instead of read as a text stream.
     """
     try:
-        content = file_path.read_text(encoding='utf-8')
         if file_path.suffix == '.md':
-            html = markdown.markdown(content)
-            content = BeautifulSoup(html, 'html.parser').get_text()
-            
-        return _extract_docs(content, file_path)
+            content = file_path.read_text(encoding='utf-8')
+            rendered = markdown.markdown(content)
+            content = BeautifulSoup(rendered, 'html.parser').get_text()
+            yield from _extract_docs(content, file_path)
+        elif _is_large_file(file_path, ingestion_config):
+            yield from _iter_docs_mmap(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield from _iter_docs(f, file_path)
+    except UnicodeDecodeError:
+        logging.warning(f"Could not read {file_path.name} as text. Skipping the rest of the file.")
+
+def _handle_text_span(file_path: Path, ingestion_config: Optional[Dict], span: Tuple[int, int]) -> Iterator[Dict[str, str]]:
+    """
+    Handles one byte range of a large .txt or extensionless file.
+    """
+    try:
+        yield from _iter_docs_mmap(file_path, span)
     except UnicodeDecodeError:
-        logging.warning(f"Could not read {file_path.name} as text. Skipping.")
-        return []
+        logging.warning(f"Could not read bytes {span[0]}-{span[1]} of {file_path.name} as text. Skipping them.")
 
-def _handle_docx_file(file_path: Path) -> List[Dict[str, str]]:
+def _handle_docx_file(file_path: Path, ingestion_config: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
     """
     Handles .docx files by extracting text from paragraphs.
     """
     try:
         document = docx.Document(file_path)
         full_text = "\n".join([para.text for para in document.paragraphs])
-        return _extract_docs(full_text, file_path)
+        yield from _extract_docs(full_text, file_path)
     except Exception as e:
         logging.error(f"Could not process DOCX file {file_path.name}: {e}. Skipping.")
-        return []
 
-def ingest_from_dir(directory_path: Union[str, Path]) -> List[Dict[str, str]]:
+def _handle_jsonl_file(file_path: Path, ingestion_config: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
     """
-    Ingests and parses all supported files from a directory, handling both
-    structured (<doc>) and unstructured (plain text) files.
-    
-    Returns documents with full metadata including source file information.
+    Handles .jsonl files of pre-extracted records (IndicCorp, CulturaX,
+    OSCAR), yielding one document per record with its fields mapped by
+    `ingestion.field_map`.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from _iter_jsonl_records(f, file_path, _field_map(ingestion_config))
+    except UnicodeDecodeError:
+        logging.warning(f"Could not read {file_path.name} as text. Skipping the rest of the file.")
+
+def _handle_parquet_file(
+    file_path: Path,
+    ingestion_config: Optional[Dict] = None,
+    span: Optional[Tuple[int, int, int]] = None,
+) -> Iterator[Dict[str, str]]:
+    """
+    Handles .parquet files by reading Arrow record batches of
+    `ingestion.parquet_batch_size` rows, loading only the columns named in
+    `ingestion.field_map`, and yielding each batch's documents before the
+    next batch is read. With `span` (first row group, end row group, index
+    of the first row, see `_row_group_spans`) only those row groups are
+    read. Needs the optional `pyarrow` package.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        logging.error(f"Reading {file_path.name} requires the 'pyarrow' package. Skipping.")
+        return
+
+    field_map = _field_map(ingestion_config)
+    batch_size = (ingestion_config or {}).get('parquet_batch_size', 8192)
+    try:
+        parquet_file = pq.ParquetFile(file_path)
+        available = set(parquet_file.schema_arrow.names)
+        columns = [column for column in dict.fromkeys(field_map.values()) if column in available]
+
+        row_groups = range(span[0], span[1]) if span else None
+        index = span[2] if span else 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+            for record in batch.to_pylist():
+                doc = _record_doc(record, index, file_path, field_map)
+                index += 1
+                if doc:
+                    yield doc
+    except Exception as e:
+        logging.error(f"Could not process Parquet file {file_path.name}: {e}. Skipping the rest of the file.")
+
+def _row_group_spans(file_path: Path, span_size: int) -> List[Tuple[Tuple[int, int, int], int]]:
+    """
+    Splits a Parquet file into runs of row groups of at least `span_size`
+    bytes on disk, returning each run's (first row group, end row group,
+    index of the first row) span for `_handle_parquet_file` with its size.
+    """
+    import pyarrow.parquet as pq
+
+    metadata = pq.ParquetFile(file_path).metadata
+    spans = []
+    start = rows = first_row = size = 0
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        size += sum(row_group.column(column).total_compressed_size for column in range(row_group.num_columns))
+        rows += row_group.num_rows
+        if size >= span_size or group == metadata.num_row_groups - 1:
+            spans.append(((start, group + 1, first_row), size))
+            start, first_row, size = group + 1, rows, 0
+    return spans
+
+def _open_zstd(file_path: Path) -> TextIO:
+    """
+    Opens a .zst file as a decompressing text stream. Needs the optional
+    `zstandard` package.
+    """
+    import zstandard
+    reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    return io.TextIOWrapper(reader, encoding='utf-8')
+
+_DECOMPRESSORS = {
+    '.bz2': partial(bz2.open, mode='rt', encoding='utf-8'),
+    '.gz': partial(gzip.open, mode='rt', encoding='utf-8'),
+    '.xz': partial(lzma.open, mode='rt', encoding='utf-8'),
+    '.zst': _open_zstd,
+}
+
+def _handle_compressed_file(file_path: Path, ingestion_config: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
+    """
+    Handles .bz2, .gz, .xz and .zst files (e.g. WikiExtractor's
+    wiki_00.bz2) by decompressing them as a stream straight into the <doc>
+    scanner and yielding each document as it is parsed, so the decompressed
+    text is neither written to disk nor held in memory. A compressed .md
+    file is rendered like an uncompressed one and a compressed .jsonl file
+    is read record by record.
+    """
+    inner_suffix = Path(file_path.stem).suffix
+    try:
+        with _DECOMPRESSORS[file_path.suffix](file_path) as f:
+            if inner_suffix == '.jsonl':
+                yield from _iter_jsonl_records(f, file_path, _field_map(ingestion_config))
+            elif inner_suffix == '.md':
+                rendered = markdown.markdown(f.read())
+                yield from _extract_docs(BeautifulSoup(rendered, 'html.parser').get_text(), file_path)
+            else:
+                yield from _iter_docs(f, file_path)
+    except ImportError:
+        logging.error(f"Reading {file_path.name} requires the 'zstandard' package. Skipping.")
+    except UnicodeDecodeError:
+        logging.warning(f"Could not read {file_path.name} as text. Skipping the rest of the file.")
+    except Exception as e:
+        logging.error(f"Could not decompress {file_path.name}: {e}. Skipping the rest of the file.")
+
+_HANDLERS = {
+    '.txt': _handle_text_file,
+    '.md': _handle_text_file,
+    '': _handle_text_file,
+    '.docx': _handle_docx_file,
+    '.jsonl': _handle_jsonl_file,
+    '.parquet': _handle_parquet_file,
+    **{suffix: _handle_compressed_file for suffix in _DECOMPRESSORS},
+}
+
+# Handlers for parts of large files, which are split into parts (see
+# `_split_file`) so that the worker pool can parse them in parallel
+_SPAN_HANDLERS = {
+    '.txt': _handle_text_span,
+    '': _handle_text_span,
+    '.parquet': _handle_parquet_file,
+}
+
+def _split_file(file_path: Path, ingestion_config: Dict) -> List[Tuple[Optional[tuple], int]]:
+    """
+    Returns the (span, size) parse units of a file: a large file of a type
+    in `_SPAN_HANDLERS` is split into parts of about `mmap_threshold_mb`,
+    any other file is one unit with span None.
+    """
+    size = file_path.stat().st_size
+    if file_path.suffix not in _SPAN_HANDLERS or not _is_large_file(file_path, ingestion_config):
+        return [(None, size)]
+    if file_path.suffix == '.parquet':
+        try:
+            spans = _row_group_spans(file_path, _threshold_bytes(ingestion_config))
+        except Exception:
+            # Unreadable without pyarrow or corrupt: the handler reports it
+            return [(None, size)]
+        return spans or [(None, size)]
+    return [(span, span[1] - span[0]) for span in _mmap_spans(file_path, _threshold_bytes(ingestion_config))]
+
+def _parse_file(file_path: Path, ingestion_config: Dict, span: Optional[tuple] = None) -> Tuple[Path, List[Dict[str, str]], float]:
+    """
+    Parses one file (or one span of it) in a worker process with the
+    handler for its type, collecting its documents to send them back, and
+    times it.
+    """
+    start = time.perf_counter()
+    if span is None:
+        file_documents = list(_HANDLERS[file_path.suffix](file_path, ingestion_config))
+    else:
+        file_documents = list(_SPAN_HANDLERS[file_path.suffix](file_path, ingestion_config, span))
+    return file_path, file_documents, time.perf_counter() - start
+
+def _matches(relative_path: str, patterns: List[str]) -> bool:
+    """
+    Checks a relative path (or just its file name) against glob patterns.
+    """
+    name = relative_path.rsplit('/', 1)[-1]
+    return any(fnmatch(relative_path, pattern) or fnmatch(name, pattern) for pattern in patterns)
+
+def _discover_files(directory_path: Path, ingestion_config: Dict) -> List[Path]:
+    """
+    Returns the supported files of a directory in sorted path order.
+
+    With `recursive`, subdirectories (e.g. WikiExtractor's AA/, AB/ shards)
+    are searched too. Files must match one of the `include` globs and none
+    of the `exclude` globs; globs are matched against the path relative to
+    the directory and against the file name.
+    """
+    include = ingestion_config.get('include') or ['*']
+    exclude = ingestion_config.get('exclude') or []
+    candidates = directory_path.rglob('*') if ingestion_config.get('recursive', True) else directory_path.iterdir()
+
+    files = []
+    for file_path in sorted(candidates):
+        if not file_path.is_file():
+            continue
+        relative_path = file_path.relative_to(directory_path).as_posix()
+        if not _matches(relative_path, include) or _matches(relative_path, exclude):
+            continue
+        if file_path.suffix not in _HANDLERS:
+            logging.info(f"Skipping unsupported file type: {relative_path}")
+            continue
+        files.append(file_path)
+    return files
+
+def _submit_largest_first(pool: Pool, units: List[tuple], ingestion_config: Dict) -> Dict[tuple, object]:
+    """
+    Submits (file, span, size) units to the pool largest first and returns
+    their pending results.
+    """
+    by_size = sorted(units, key=lambda unit: unit[2], reverse=True)
+    return {
+        (file_path, span): pool.apply_async(_parse_file, (file_path, ingestion_config, span))
+        for file_path, span, _ in by_size
+    }
+
+def _parse_files(files: List[Path], ingestion_config: Dict) -> Iterator[Tuple[Path, Iterable[Dict[str, str]], float]]:
+    """
+    Yields (file, documents, worker seconds) in `files` order, fanning the
+    parsing out to `ingestion.workers` processes. A large file split into
+    parts (see `_split_file`) is yielded once per part, in order.
+
+    Without workers, documents are a lazy iterator parsed in this process
+    as they are consumed, so a shard never has to fit in memory. With them,
+    files and parts are scheduled in windows of `schedule_window` units
+    (0 = all at once). Within a window the largest units are submitted
+    first, so a giant file starts early instead of becoming the straggler
+    at the end, and the next window is submitted before the current one is
+    consumed so the workers stay busy. At most two windows of results are
+    held in memory. Large files that cannot be split (.md, compressed) are
+    streamed in this process while the pool works on the windows in flight.
+    """
+    workers = ingestion_config.get('workers', 1) or os.cpu_count()
+    if workers <= 1:
+        for file_path in files:
+            yield file_path, _HANDLERS[file_path.suffix](file_path, ingestion_config), 0.0
+        return
+
+    units = []
+    for file_path in files:
+        if _is_large_file(file_path, ingestion_config) and file_path.suffix not in _SPAN_HANDLERS:
+            units.append((file_path, None, None))
+        else:
+            units.extend((file_path, span, size) for span, size in _split_file(file_path, ingestion_config))
+    pooled = [unit for unit in units if unit[2] is not None]
+    window = ingestion_config.get('schedule_window', 64) or len(pooled) or 1
+    windows = [pooled[start:start + window] for start in range(0, len(pooled), window)]
+
+    with Pool(workers) as pool:
+        pending = {}
+        submitted = 0
+        consumed = 0
+        for file_path, span, size in units:
+            # Keep the window after the one being consumed in flight
+            while submitted < len(windows) and submitted <= consumed // window + 1:
+                pending.update(_submit_largest_first(pool, windows[submitted], ingestion_config))
+                submitted += 1
+
+            if size is None:
+                yield file_path, _HANDLERS[file_path.suffix](file_path, ingestion_config), 0.0
+                continue
+            consumed += 1
+            yield pending.pop((file_path, span)).get()
+
+def _log_timings(timings: List[Tuple[float, str]], ingestion_config: Dict):
+    """
+    Logs the slowest files of an ingestion run.
     """
+    report_slowest = ingestion_config.get('report_slowest', 5)
+    if not timings or not report_slowest:
+        return
+    slowest = sorted(timings, reverse=True)[:report_slowest]
+    logging.info("Slowest files: " + ", ".join(f"{name} ({seconds:.2f}s)" for seconds, name in slowest))
+
+def iter_from_dir(directory_path: Union[str, Path], config: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
+    """
+    Lazily ingests and parses all supported files from a directory, handling
+    both structured (<doc>) and unstructured (plain text) files.
+
+    Files are discovered (recursively by default) and filtered with the
+    `ingestion.include`/`exclude` globs. Documents are yielded file by file
+    in sorted path order, so doc ids are stable across runs. With
+    `ingestion.workers` above 1, files are parsed in a process pool,
+    largest first within each scheduling window; the output order is the
+    same. Text files of at least `ingestion.mmap_threshold_mb` are split
+    into parts of about that size, parsed in parallel as well.
+
+    Every file's parse time is logged; files slower than
+    `ingestion.slow_file_seconds` are flagged with a warning and the slowest
+    files are listed at the end.
+    """
+    ingestion_config = (config or {}).get('ingestion', {})
     directory_path = Path(directory_path)
     if not directory_path.is_dir():
         logging.error(f"Directory not found at {directory_path}")
-        return []
+        return
+
+    workers = ingestion_config.get('workers', 1) or os.cpu_count()
+    slow_file_seconds = ingestion_config.get('slow_file_seconds', 30)
 
     logging.info(f"Starting ingestion from: {directory_path}")
+    files = _discover_files(directory_path, ingestion_config)
+    if workers > 1:
+        logging.info(f"Parsing {len(files)} files with {workers} worker processes")
     
-    all_documents = []
+    total_documents = 0
+    timings = []
     
-    for file_path in directory_path.iterdir():
-        if not file_path.is_file():
-            continue
+    for file_path, parts in groupby(_parse_files(files, ingestion_config), key=lambda part: part[0]):
+        seconds = 0.0
+        document_count = 0
+        for _, file_documents, worker_seconds in parts:
+            # Documents parsed lazily are timed while they are produced,
+            # leaving out the time the caller spends on them between documents
+            seconds += worker_seconds
+            documents = iter(file_documents)
+            while True:
+                start = time.perf_counter()
+                doc = next(documents, None)
+                seconds += time.perf_counter() - start
+                if doc is None:
+                    break
+                document_count += 1
+                yield doc
 
-        logging.info(f"  -> Processing file: {file_path.name}")
-        
-        if file_path.suffix in ['.txt', '.md', '']:
-            all_documents.extend(_handle_text_file(file_path))
-        elif file_path.suffix == '.docx':
-            all_documents.extend(_handle_docx_file(file_path))
-        else:
-            logging.info(f"Skipping unsupported file type: {file_path.name}")
+        relative_path = file_path.relative_to(directory_path).as_posix()
+        logging.info(f"  -> Processed file: {relative_path} ({document_count} documents, {seconds:.2f}s)")
+        if slow_file_seconds and seconds > slow_file_seconds:
+            logging.warning(f"Slow file: {file_path} took {seconds:.1f}s to parse")
+        timings.append((seconds, relative_path))
+        total_documents += document_count
+
+    _log_timings(timings, ingestion_config)
+    logging.info(f"Ingestion complete. Found {total_documents} documents in total.")
 
-    logging.info(f"Ingestion complete. Found {len(all_documents)} documents in total.")
-    return all_documents
\ No newline at end of file
+def ingest_from_dir(directory_path: Union[str, Path], config: Optional[Dict] = None) -> List[Dict[str, str]]:
+    """
+    Ingests and parses all supported files from a directory, handling both
+    structured (<doc>) and unstructured (plain text) files.
+    
+    Returns documents with full metadata including source file information.
+    """
+    return list(iter_from_dir(directory_path, config))
@@ -1,21 +1,32 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
+import random
 import re
 import time
-from typing import List, Dict
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, NamedTuple, Optional
 from dotenv import load_dotenv
 from huggingface_hub import hf_hub_download
-from llama_cpp import Llama
+from llama_cpp import Llama, LlamaGrammar, llama_get_logits
 import google.generativeai as genai
 from tqdm import tqdm
+from .rate_limit import TokenBucketLimiter
+from .score_cache import ScoreCache
 
+# Bump whenever the scoring prompt changes, so cached scores produced with
+# the old prompt are no longer reused.
+PROMPT_VERSION = "1"
 
-def _prompt(text: str) -> str:
-    """
-    Creates the prompt for the LLM to score the text.
-    """
-    return f"""You are a Linguistic Quality Assurance Specialist for Malayalam. Your task is to provide a critical and precise evaluation of the following text. Your primary goal is to identify and fail text that is semantically or logically incoherent. You must respond ONLY with a valid JSON object.
+
+# The scoring prompt is a fixed rubric prefix followed by the chunk text and
+# a short suffix. Keeping the prefix constant lets the local model evaluate it
+# once and reuse it for every chunk.
+_PROMPT_PREFIX = """You are a Linguistic Quality Assurance Specialist for Malayalam. Your task is to provide a critical and precise evaluation of the following text. Your primary goal is to identify and fail text that is semantically or logically incoherent. You must respond ONLY with a valid JSON object.
 
 Follow this thought process step-by-step:
 1.  **Fluency Analysis:** Read the text. Does it flow naturally in Malayalam?
@@ -32,135 +43,579 @@ Analyze the following text and provide your score and a brief, precise reason in
 
 Text:
 \"\"\"
-{text}
+"""
+
+_PROMPT_SUFFIX = """
 \"\"\"
 
 JSON Response:
 """
 
 
-def _score_with_api(documents: List[Dict[str, str]], config: Dict) -> List[Dict[str, str]]:
+# Reduced prompt for `mode: score_only`: same rubric, but the model answers
+# with the bare score so a single constrained token is decoded.
+_SCORE_ONLY_PREFIX = """You are a Linguistic Quality Assurance Specialist for Malayalam. Your task is to provide a critical and precise evaluation of the following text. Your primary goal is to identify and fail text that is semantically or logically incoherent. Prioritize coherence above all else.
+
+SCORING RUBRIC:
+- **Score 8-10 (High Quality):** Fluent, fully coherent, and well-structured.
+- **Score 6-7 (Acceptable Quality):** Generally fluent and coherent, may have minor stylistic issues.
+- **Score 4-5 (Low Quality):** Difficult to read, contains grammatical errors OR a noticeable lack of logical coherence.
+- **Score 1-3 (Garbage Quality):** Completely unacceptable, grammatically broken, semantically nonsensical, or not Malayalam.
+
+Respond ONLY with the score for the following text, as a single integer from 1 to 10.
+
+Text:
+\"\"\"
+"""
+
+_SCORE_ONLY_SUFFIX = """
+\"\"\"
+
+Score:"""
+
+_SCORE_ONLY_REASON = "Score-only mode: no reason generated"
+
+
+class _PromptTemplate(NamedTuple):
     """
-    Scores pre-chunked documents using the Google Gemini API with retry logic.
-    
-    Args:
-        documents: List of document chunks (already chunked, one chunk per document)
-        config: API configuration dictionary
-    
-    Returns:
-        Same documents list with llm_score and llm_reason fields added
+    A scoring prompt: a fixed prefix, the chunk text, then a fixed suffix.
+    """
+    name: str
+    prefix: str
+    suffix: str
+    score_only: bool
+
+    def render(self, text: str) -> str:
+        return self.prefix + text + self.suffix
+
+
+_FULL_PROMPT = _PromptTemplate('full', _PROMPT_PREFIX, _PROMPT_SUFFIX, score_only=False)
+_SCORE_ONLY_PROMPT = _PromptTemplate('score_only', _SCORE_ONLY_PREFIX, _SCORE_ONLY_SUFFIX, score_only=True)
+
+
+# GBNF grammar for {"score": 1-10, "reason": "..."} with a capped reason
+# length. Decoding stops as soon as the object closes.
+_SCORE_JSON_GRAMMAR = r'''
+root   ::= "{" ws "\"score\"" ws ":" ws score ws "," ws "\"reason\"" ws ":" ws reason ws "}"
+score  ::= "10" | [1-9]
+reason ::= "\"" char{0,%d} "\""
+char   ::= [^"\\\x00-\x1f] | "\\" ["\\/bfnrt]
+ws     ::= " "?
+'''
+
+# GBNF grammar for a bare 1-10 score in score-only mode.
+_SCORE_ONLY_GRAMMAR = r'''
+root ::= " "? ("10" | [1-9])
+'''
+
+
+def _prompt(text: str) -> str:
+    """
+    Creates the prompt for the LLM to score the text.
+    """
+    return _FULL_PROMPT.render(text)
+
+
+def _parse_score_only(raw_output: str) -> Optional[int]:
+    """
+    Reads the 1-10 score from a score-only response, either a bare number or
+    a JSON object with a "score" field.
+    """
+    match = re.search(r'\b(10|[1-9])\b', raw_output)
+    return int(match.group(1)) if match else None
+
+
+def _score_distribution_summary(probabilities: Dict[int, float]) -> tuple:
+    """
+    Returns the expected score and confidence of a distribution over the
+    scores 1-10. Confidence is the probability of the most likely score.
+    """
+    total = sum(probabilities.values())
+    expected = sum(score * p for score, p in probabilities.items()) / total
+    confidence = max(probabilities.values()) / total
+    return round(expected, 2), round(confidence, 4)
+
+
+def _mark_failed(doc: Dict, reason: str):
+    """
+    Marks a chunk whose scoring failed (as opposed to scoring low).
+
+    Failed chunks get the lowest score so they are filtered out, plus an
+    `llm_error` flag so their result is never checkpointed or reused.
+    """
+    doc['llm_score'] = 1
+    doc['llm_reason'] = reason
+    doc['llm_error'] = True
+
+
+def _init_api_model(api_config: Dict):
+    """
+    Configures the Google Gemini API client and returns the generative model.
     """
-    api_config = config['api_config']
-    max_retries = api_config.get('max_retries', 3)
-    retry_delay = api_config.get('retry_delay_seconds', 5)
-    
     logging.info(f"Initializing Gemini API: {api_config['model_name']}")
 
     load_dotenv()
     
-    try:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-        genai.configure(api_key=api_key)
-        generation_config = genai.GenerationConfig(response_mime_type="application/json")
-        model = genai.GenerativeModel(api_config['model_name'], generation_config=generation_config)
-    except Exception as e:
-        logging.error(f"Failed to initialize Gemini API: {e}")
-        for doc in documents:
-            doc['llm_score'] = 1
-            doc['llm_reason'] = f"API initialization failed: {str(e)}"
-        return documents
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+    genai.configure(api_key=api_key)
+    generation_config = genai.GenerationConfig(response_mime_type="application/json")
+    model = genai.GenerativeModel(api_config['model_name'], generation_config=generation_config)
 
     logging.info("API initialized. Starting chunk scoring...")
+    return model
+
+
+def _init_local_model(local_config: Dict) -> Llama:
+    """
+    Downloads (if needed) and loads the local GGUF model.
+    """
+    logging.info(f"Initializing local model: {local_config['model_repo_id']}")
     
-    for doc in tqdm(documents, desc="Scoring chunks (API)"):
-        if not doc.get('text', '').strip():
-            doc['llm_score'] = 1
-            doc['llm_reason'] = "Empty text content"
-            continue
-        
-        prompt = _prompt(doc['text'])
-        
+    model_path = hf_hub_download(
+        repo_id=local_config['model_repo_id'], 
+        filename=local_config['model_filename']
+    )
+    context_size = local_config.get('n_ctx', 8192)
+    llm = Llama(
+        model_path=model_path, 
+        n_ctx=context_size, 
+        n_gpu_layers=local_config.get('n_gpu_layers', -1),
+        n_batch=local_config.get('n_batch', 512),
+        verbose=False
+    )
+
+    logging.info("Local model loaded. Starting chunk scoring...")
+    return llm
+
+
+def _estimate_tokens(prompt: str) -> int:
+    """
+    Roughly estimates the tokens a request uses for rate limiting: Malayalam
+    text averages about three characters per token, plus room for the
+    JSON response.
+    """
+    return len(prompt) // 3 + 256
+
+
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Returns an exponential backoff delay with jitter for a retry attempt.
+
+    The delay doubles on every attempt up to `max_delay`, and a random half
+    of it is jittered so concurrent requests do not retry in lockstep.
+    """
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def _score_one_async(doc: Dict[str, str], model, api_config: Dict, limiter: TokenBucketLimiter, semaphore: asyncio.Semaphore, template: _PromptTemplate):
+    """
+    Scores a single chunk with retries, respecting the concurrency limit and
+    the rate limiter.
+    """
+    max_retries = api_config.get('max_retries', 3)
+    retry_delay = api_config.get('retry_delay_seconds', 5)
+    max_delay = api_config.get('backoff_max_seconds', 60)
+
+    if not doc.get('text', '').strip():
+        doc['llm_score'] = 1
+        doc['llm_reason'] = "Empty text content"
+        return
+
+    prompt = template.render(doc['text'])
+    tokens = _estimate_tokens(prompt)
+
+    async with semaphore:
         for attempt in range(max_retries):
+            await limiter.acquire(tokens)
             try:
-                response = model.generate_content(prompt)
+                response = await model.generate_content_async(prompt)
+                if template.score_only:
+                    score = _parse_score_only(response.text)
+                    if score is None:
+                        raise ValueError(f"No score in response: '{response.text[:50]}'")
+                    doc['llm_score'] = score
+                    doc['llm_reason'] = _SCORE_ONLY_REASON
+                    return
+
                 response_json = json.loads(response.text)
                 doc['llm_score'] = int(response_json.get('score', 1))
                 doc['llm_reason'] = response_json.get('reason', 'No reason provided by API.')
-                break
-                
+                return
+
             except (json.JSONDecodeError, ValueError) as e:
                 logging.warning(
                     f"Attempt {attempt + 1}/{max_retries}: Invalid JSON from API "
                     f"for {doc.get('doc_name', 'unknown')} chunk {doc.get('chunk_id', 'N/A')}. "
                     f"Error: {e}"
                 )
-                doc['llm_score'] = 1
-                doc['llm_reason'] = "Invalid JSON response from API"
-                break
-                
+                _mark_failed(doc, "Invalid JSON response from API")
+                return
+
             except Exception as e:
                 logging.error(
                     f"Attempt {attempt + 1}/{max_retries}: API error "
                     f"for {doc.get('doc_name', 'unknown')} chunk {doc.get('chunk_id', 'N/A')}: {e}"
                 )
                 if attempt + 1 == max_retries:
-                    doc['llm_score'] = 1
-                    doc['llm_reason'] = 'API error after multiple retries'
+                    _mark_failed(doc, 'API error after multiple retries')
                 else:
-                    logging.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+                    delay = _backoff_delay(attempt, retry_delay, max_delay)
+                    logging.info(f"Retrying in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
 
-    return documents
+
+async def _score_with_api_async(documents: List[Dict[str, str]], model, api_config: Dict, limiter: TokenBucketLimiter, template: _PromptTemplate):
+    """
+    Scores chunks concurrently, at most `concurrency` requests in flight.
+    """
+    semaphore = asyncio.Semaphore(api_config.get('concurrency', 4))
+    tasks = [
+        asyncio.ensure_future(_score_one_async(doc, model, api_config, limiter, semaphore, template))
+        for doc in documents
+    ]
+    with tqdm(total=len(tasks), desc="Scoring chunks (API)") as progress:
+        for task in asyncio.as_completed(tasks):
+            await task
+            progress.update(1)
 
 
-def _score_with_local(documents: List[Dict[str, str]], config: Dict) -> List[Dict[str, str]]:
+def _score_with_api(documents: List[Dict[str, str]], model, config: Dict, loop: asyncio.AbstractEventLoop, limiter: TokenBucketLimiter, template: _PromptTemplate = _FULL_PROMPT) -> List[Dict[str, str]]:
     """
-    Scores pre-chunked documents using a local GGUF model.
+    Scores pre-chunked documents using the Google Gemini API with concurrent
+    requests, rate limiting and retry logic.
+
+    Each document is updated in place, so results stay in input order no
+    matter in which order the requests complete. `model` only needs an async
+    `generate_content_async(prompt)` returning an object with a `.text`
+    attribute, so a local stub can stand in for the Gemini client.
     
     Args:
         documents: List of document chunks (already chunked, one chunk per document)
-        config: Local model configuration dictionary
+        model: Initialized Gemini generative model
+        config: LLM scorer configuration dictionary
+        loop: Event loop reused across batches
+        limiter: Rate limiter shared across batches
+        template: Prompt to score with (full or score-only)
     
     Returns:
         Same documents list with llm_score and llm_reason fields added
     """
-    local_config = config['local_config']
-    logging.info(f"Initializing local model: {local_config['model_repo_id']}")
-    
-    try:
-        model_path = hf_hub_download(
-            repo_id=local_config['model_repo_id'], 
-            filename=local_config['model_filename']
-        )
-        context_size = local_config.get('n_ctx', 8192)
-        llm = Llama(
-            model_path=model_path, 
-            n_ctx=context_size, 
-            n_gpu_layers=local_config.get('n_gpu_layers', -1),
-            verbose=False
-        )
-    except Exception as e:
-        logging.error(f"Failed to load local model: {e}")
-        for doc in documents:
-            doc['llm_score'] = 1
-            doc['llm_reason'] = f"Model loading failed: {str(e)}"
-        return documents
+    loop.run_until_complete(_score_with_api_async(documents, model, config['api_config'], limiter, template))
+    return documents
 
-    logging.info("Local model loaded. Starting chunk scoring...")
 
+class _LocalSession:
+    """
+    A loaded llama.cpp model plus the tokenized prompt prefixes and
+    throughput counters.
+
+    llama-cpp-python evaluates one sequence per call, so chunks cannot share
+    a forward pass. Instead every prompt starts with the same tokenized
+    rubric prefix, which llama.cpp's prefix matching keeps in the KV cache,
+    so each call only evaluates the chunk text and the answer.
+
+    With a single template, prefix matching alone keeps the prefix cached.
+    When templates alternate (score-only mode's reason pass) and
+    `prefix_cache` is enabled, each prefix's model state is snapshotted with
+    `save_state()` once a second template is in use, at a point where the
+    prefix is cached or being evaluated anyway. Before each chunk the
+    snapshot is restored with `load_state()` if the prefix is no longer
+    cached. A single-template run never takes a snapshot.
+    """
+
+    def __init__(self, llm: Llama, local_config: Dict):
+        self.llm = llm
+        self.stats = Counter()
+        self.max_tokens = local_config.get('max_tokens', 512)
+        self.prefix_cache = local_config.get('prefix_cache', True)
+        self._baseline_pending = local_config.get('throughput_baseline', True)
+        self.scoring_method = local_config.get('scoring_method', 'generate')
+        self.min_score_mass = local_config.get('min_score_mass', 0.5)
+        self.grammar = None
+        self.score_only_grammar = None
+        if local_config.get('json_grammar', True):
+            max_reason_chars = local_config.get('max_reason_chars', 200)
+            self.grammar = LlamaGrammar.from_string(_SCORE_JSON_GRAMMAR % max_reason_chars, verbose=False)
+            self.score_only_grammar = LlamaGrammar.from_string(_SCORE_ONLY_GRAMMAR, verbose=False)
+        self._prefixes = {}
+        self._score_tokens = None
+        self._space_tokens = None
+
+    def _prefix(self, template: _PromptTemplate) -> tuple:
+        """
+        Returns the (tokens, saved state or None) of a template's prefix,
+        tokenizing it on first use.
+        """
+        if template.name not in self._prefixes:
+            tokens = self.llm.tokenize(template.prefix.encode('utf-8'), add_bos=True)
+            self._prefixes[template.name] = (tokens, None)
+        return self._prefixes[template.name]
+
+    def _snapshot(self, name: str, tokens: List[int]):
+        """
+        Saves the model state of a prefix that fills the KV cache's start,
+        dropping whatever was cached after it.
+        """
+        self.llm.n_tokens = len(tokens)
+        self._prefixes[name] = (tokens, self.llm.save_state())
+        logging.info(f"Cached model state for the {len(tokens)}-token '{name}' prompt prefix")
+
+    def prompt_tokens(self, text: str, template: _PromptTemplate = _FULL_PROMPT) -> List[int]:
+        """
+        Returns the prompt tokens for a chunk, starting with the cached prefix.
+        """
+        prefix_tokens, _ = self._prefix(template)
+        suffix = self.llm.tokenize((text + template.suffix).encode('utf-8'), add_bos=False)
+        return prefix_tokens + suffix
+
+    def _cached_prefix_length(self, tokens: List[int]) -> int:
+        """
+        Returns how many leading `tokens` are already in the KV cache.
+        """
+        cached = self.llm.input_ids[:self.llm.n_tokens]
+        length = 0
+        for cached_token, token in zip(cached, tokens):
+            if cached_token != token:
+                break
+            length += 1
+        return length
+
+    def _restore_prefix(self, template: _PromptTemplate) -> int:
+        """
+        Makes the KV cache start with the template's prefix when templates
+        alternate: restores its snapshot, or evaluates and snapshots it if
+        it has none yet. Another template's prefix still in the cache is
+        snapshotted first. Returns the number of tokens evaluated.
+        """
+        prefix_tokens, state = self._prefix(template)
+        if not self.prefix_cache or len(self._prefixes) < 2:
+            return 0
+        cached = self._cached_prefix_length(prefix_tokens)
+        if cached == len(prefix_tokens):
+            return 0
+
+        for name, (tokens, saved) in list(self._prefixes.items()):
+            if saved is None and name != template.name and self._cached_prefix_length(tokens) == len(tokens):
+                self._snapshot(name, tokens)
+
+        if state is not None:
+            self.llm.load_state(state)
+            self.stats['local_prefix_restores'] += 1
+            return 0
+
+        # The prompt needs the prefix evaluated anyway, so snapshot it then
+        cached = self._cached_prefix_length(prefix_tokens)
+        self.llm.n_tokens = cached
+        self.llm.eval(prefix_tokens[cached:])
+        self._snapshot(template.name, prefix_tokens)
+        return len(prefix_tokens) - cached
+
+    def complete(self, tokens: List[int], template: _PromptTemplate = _FULL_PROMPT, **kwargs) -> str:
+        """
+        Runs a completion for prompt `tokens` and records throughput.
+
+        With `throughput_baseline`, the first completion of a session runs on
+        an emptied KV cache and is recorded separately as the no-reuse
+        baseline that the throughput of the other completions is compared
+        against.
+        """
+        if self._baseline_pending:
+            self._baseline_pending = False
+            self.llm.reset()
+            start = time.perf_counter()
+            response = self.llm(tokens, **kwargs)
+            self.stats['local_baseline_seconds'] += time.perf_counter() - start
+            usage = response.get('usage', {})
+            self.stats['local_baseline_tokens'] += (
+                usage.get('prompt_tokens', len(tokens)) + usage.get('completion_tokens', 0)
+            )
+            return response['choices'][0]['text']
+
+        start = time.perf_counter()
+        evaluated = self._restore_prefix(template)
+        reused = self._cached_prefix_length(tokens) - evaluated
+        response = self.llm(tokens, **kwargs)
+        self.stats['local_seconds'] += time.perf_counter() - start
+
+        usage = response.get('usage', {})
+        self.stats['local_prompt_tokens'] += usage.get('prompt_tokens', len(tokens))
+        self.stats['local_reused_tokens'] += reused
+        self.stats['local_completion_tokens'] += usage.get('completion_tokens', 0)
+        return response['choices'][0]['text']
+
+    def _next_token_logprobs(self) -> np.ndarray:
+        """
+        Returns log-probabilities of the next token after the evaluated tokens.
+        """
+        logits = np.ctypeslib.as_array(llama_get_logits(self.llm.ctx), shape=(self.llm.n_vocab(),))
+        logits = logits.astype(np.float64)
+        return logits - (logits.max() + np.log(np.exp(logits - logits.max()).sum()))
+
+    def _score_token_ids(self) -> tuple:
+        """
+        Returns the token ids that start each score after the prompt.
+
+        Each score is tokenized with and without a leading space. Scores that
+        are a single token map to their ids; a "10" split into "1" + "0" is
+        returned separately as the set of second tokens.
+        """
+        if self._score_tokens is None:
+            single = {score: set() for score in range(1, 11)}
+            ten_second_tokens = set()
+            for score in range(1, 11):
+                for variant in (str(score), f" {score}"):
+                    tokens = self.llm.tokenize(variant.encode('utf-8'), add_bos=False)
+                    if len(tokens) == 1:
+                        single[score].add(tokens[0])
+                    elif score == 10 and len(tokens) == 2:
+                        ten_second_tokens.add(tokens[1])
+            self._score_tokens = (single, ten_second_tokens)
+        return self._score_tokens
+
+    def _space_token_ids(self) -> List[int]:
+        """
+        Returns the token ids a lone space after the prompt can be encoded
+        as. SentencePiece vocabularies put much of the mass after "Score:"
+        on such a token rather than on the digits.
+        """
+        if self._space_tokens is None:
+            tokens = self.llm.tokenize(b" ", add_bos=False)
+            self._space_tokens = tokens if len(tokens) == 1 else []
+        return self._space_tokens
+
+    def _score_probabilities_here(self, logprobs: np.ndarray, position: int) -> Dict[int, float]:
+        """
+        Returns the probability of each score 1-10 as the next token, given
+        the log-probabilities after the first `position` evaluated tokens.
+
+        If "10" is not a single token, one extra step after the most likely
+        "1" token splits its probability between 1 and 10 using the
+        probability of "0"; the cache is then rewound to `position`.
+        """
+        single, ten_second_tokens = self._score_token_ids()
+        probabilities = {
+            score: float(sum(np.exp(logprobs[token]) for token in ids))
+            for score, ids in single.items()
+        }
+
+        one_tokens = sorted(single[1], key=lambda token: logprobs[token], reverse=True)
+        if ten_second_tokens and one_tokens and probabilities[1] > 1e-3:
+            self.llm.eval([one_tokens[0]])
+            next_logprobs = self._next_token_logprobs()
+            p_zero = float(sum(np.exp(next_logprobs[token]) for token in ten_second_tokens))
+            probabilities[10] += probabilities[1] * p_zero
+            probabilities[1] *= 1 - p_zero
+            self.llm.n_tokens = position
+            self.stats['local_completion_tokens'] += 1
+        return probabilities
+
+    def score_probabilities(self, tokens: List[int], template: _PromptTemplate) -> Optional[Dict[int, float]]:
+        """
+        Evaluates the prompt and returns the raw probability of each score
+        1-10 at the score position, or None if the scores have no
+        probability mass.
+
+        The prompt is evaluated without sampling. When the model may first
+        emit a space token, one extra step through it adds the scores that
+        follow the space, weighted by the space's probability.
+        """
+        start = time.perf_counter()
+        evaluated = self._restore_prefix(template)
+        # Re-evaluate at least the last token so its logits are current
+        cached = min(self._cached_prefix_length(tokens), len(tokens) - 1)
+        self.llm.n_tokens = cached
+        self.llm.eval(tokens[cached:])
+        reused = cached - evaluated
+
+        logprobs = self._next_token_logprobs()
+        space_tokens = sorted(self._space_token_ids(), key=lambda token: logprobs[token], reverse=True)
+        p_space = float(sum(np.exp(logprobs[token]) for token in space_tokens))
+        probabilities = self._score_probabilities_here(logprobs, len(tokens))
+
+        if space_tokens and p_space > 1e-3:
+            self.llm.eval([space_tokens[0]])
+            after_space = self._score_probabilities_here(self._next_token_logprobs(), len(tokens) + 1)
+            for score, p in after_space.items():
+                probabilities[score] += p_space * p
+            self.stats['local_completion_tokens'] += 1
+
+        self.stats['local_seconds'] += time.perf_counter() - start
+        self.stats['local_prompt_tokens'] += len(tokens)
+        self.stats['local_reused_tokens'] += reused
+
+        if sum(probabilities.values()) <= 1e-9:
+            return None
+        return probabilities
+
+
+def _score_with_local(documents: List[Dict[str, str]], session: _LocalSession, template: _PromptTemplate = _FULL_PROMPT) -> List[Dict[str, str]]:
+    """
+    Scores pre-chunked documents using a local GGUF model.
+    
+    Args:
+        documents: List of document chunks (already chunked, one chunk per document)
+        session: Loaded llama.cpp model with the cached prompt prefix
+        template: Prompt to score with (full or score-only)
+    
+    Returns:
+        Same documents list with llm_score and llm_reason fields added
+    """
     for doc in tqdm(documents, desc="Scoring chunks (Local)"):
         if not doc.get('text', '').strip():
             doc['llm_score'] = 1
             doc['llm_reason'] = "Empty text content"
             continue
         
-        prompt = _prompt(doc['text'])
-        
         try:
-            response = llm(prompt, max_tokens=512, temperature=0.0)
-            raw_output = response['choices'][0]['text']
+            prompt_tokens = session.prompt_tokens(doc['text'], template)
+
+            if template.score_only and session.scoring_method == 'logits':
+                probabilities = session.score_probabilities(prompt_tokens, template)
+                score_mass = sum(probabilities.values()) if probabilities else 0.0
+                if score_mass < session.min_score_mass:
+                    # The model is not answering with a score, so the
+                    # normalized distribution would be noise
+                    logging.warning(
+                        f"Only {score_mass:.3f} probability on the scores for {doc.get('doc_name', 'unknown')} "
+                        f"chunk {doc.get('chunk_id', 'N/A')}"
+                    )
+                    session.stats['local_low_score_mass'] += 1
+                    _mark_failed(doc, "Low score probability in model output")
+                else:
+                    doc['llm_score'], doc['llm_score_confidence'] = _score_distribution_summary(probabilities)
+                    doc['llm_reason'] = _SCORE_ONLY_REASON
+                continue
+
+            if template.score_only:
+                raw_output = session.complete(
+                    prompt_tokens,
+                    template,
+                    max_tokens=4,
+                    temperature=0.0,
+                    grammar=session.score_only_grammar
+                )
+                score = _parse_score_only(raw_output)
+                if score is None:
+                    logging.warning(
+                        f"No score in model output for {doc.get('doc_name', 'unknown')} "
+                        f"chunk {doc.get('chunk_id', 'N/A')}: '{raw_output[:50]}'"
+                    )
+                    _mark_failed(doc, "No score in model output")
+                else:
+                    doc['llm_score'] = score
+                    doc['llm_reason'] = _SCORE_ONLY_REASON
+                continue
+
+            raw_output = session.complete(
+                prompt_tokens,
+                template,
+                max_tokens=session.max_tokens,
+                temperature=0.0,
+                grammar=session.grammar
+            )
             
             json_match = re.search(r'\{.*\}', raw_output, re.DOTALL)
             if json_match:
@@ -174,8 +629,7 @@ def _score_with_local(documents: List[Dict[str, str]], config: Dict) -> List[Dic
                     f"chunk {doc.get('chunk_id', 'N/A')}. "
                     f"Raw output: '{raw_output[:100]}...'"
                 )
-                doc['llm_score'] = 1
-                doc['llm_reason'] = "No valid JSON in model output"
+                _mark_failed(doc, "No valid JSON in model output")
         
         except json.JSONDecodeError as e:
             logging.warning(
@@ -183,20 +637,247 @@ def _score_with_local(documents: List[Dict[str, str]], config: Dict) -> List[Dic
                 f"chunk {doc.get('chunk_id', 'N/A')}: '{json_string[:100]}...'. "
                 f"Error: {e}"
             )
-            doc['llm_score'] = 1
-            doc['llm_reason'] = f"Invalid JSON: {json_string[:50]}"
+            _mark_failed(doc, f"Invalid JSON: {json_string[:50]}")
         
         except Exception as e:
             logging.error(
                 f"Inference error for {doc.get('doc_name', 'unknown')} "
                 f"chunk {doc.get('chunk_id', 'N/A')}: {e}"
             )
-            doc['llm_score'] = 1
-            doc['llm_reason'] = 'Inference error'
+            _mark_failed(doc, 'Inference error')
     
     return documents
 
 
+def _open_score_cache(config: Dict) -> Optional[ScoreCache]:
+    """
+    Opens the persistent score cache if `llm_scorer.cache` is enabled.
+    """
+    cache_config = config.get('llm_scorer', {}).get('cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+
+    cache_path = cache_config.get('path')
+    if not cache_path:
+        cache_path = Path(config['paths']['processed_data_dir']) / 'score_cache.sqlite'
+    return ScoreCache(cache_path, max_entries=cache_config.get('max_entries', 1_000_000))
+
+
+class LLMScorer:
+    """
+    Scores document chunks with the configured LLM provider.
+
+    The API client or local model is initialized on first use and reused for
+    every later call, so chunks can be scored batch by batch as they stream
+    through the pipeline. If the score cache is enabled, it is consulted
+    before any inference and filled with every successful result.
+
+    In `score_only` mode every chunk is first scored with the reduced
+    prompt. Only chunks whose score lies within `reason_margin` of
+    `score_threshold`, plus a deterministic `audit_rate` sample of the rest,
+    are then rescored with the full prompt to obtain a reason.
+
+    With the local `scoring_method: logits`, scores are read from the
+    probability distribution over the score tokens instead of being
+    generated. This always uses the score-only prompt, so reasons are
+    generated as in `score_only` mode; the full prompt then only adds the
+    reason, and the expected score and its confidence are kept.
+    """
+
+    def __init__(self, config: Dict):
+        self.scorer_config = config.get('llm_scorer', {})
+        self.provider = self.scorer_config.get('provider')
+        self.mode = self.scorer_config.get('mode', 'full')
+        self.scoring_method = 'generate'
+        if self.provider == 'local':
+            self.scoring_method = self.scorer_config.get('local_config', {}).get('scoring_method', 'generate')
+        if self.scoring_method == 'logits' and self.mode != 'score_only':
+            logging.info("LLM Scorer: logits scoring uses the score-only prompt; switching to mode 'score_only'")
+            self.mode = 'score_only'
+        self.cache = _open_score_cache(config)
+        self._counters = Counter()
+        self._loop = None
+        self._limiter = None
+        self._model = None
+        self._init_error = None
+        self._initialized = False
+
+    def _model_name(self) -> str:
+        if self.provider == 'api':
+            return self.scorer_config['api_config']['model_name']
+        if self.provider == 'local':
+            local_config = self.scorer_config['local_config']
+            return f"{local_config['model_repo_id']}/{local_config['model_filename']}"
+        return str(self.provider)
+
+    @property
+    def identity(self) -> str:
+        """
+        Identifies what produces the scores: provider, model, prompt version,
+        mode and scoring method. Results recorded under a different identity
+        must not be reused.
+        """
+        return f"{self.provider}/{self._model_name()}/{PROMPT_VERSION}/{self.mode}/{self.scoring_method}"
+
+    def _initialize(self):
+        if self._initialized:
+            return
+        self._initialized = True
+
+        logging.info(f"LLM Scorer: Using provider '{self.provider}'")
+
+        if self.provider == 'api':
+            api_config = self.scorer_config['api_config']
+            self._loop = asyncio.new_event_loop()
+            self._limiter = TokenBucketLimiter(
+                requests_per_minute=api_config.get('requests_per_minute'),
+                tokens_per_minute=api_config.get('tokens_per_minute')
+            )
+            try:
+                self._model = _init_api_model(api_config)
+            except Exception as e:
+                logging.error(f"Failed to initialize Gemini API: {e}")
+                self._init_error = f"API initialization failed: {str(e)}"
+        elif self.provider == 'local':
+            try:
+                local_config = self.scorer_config['local_config']
+                self._model = _LocalSession(_init_local_model(local_config), local_config)
+            except Exception as e:
+                logging.error(f"Failed to load local model: {e}")
+                self._init_error = f"Model loading failed: {str(e)}"
+        else:
+            logging.warning(f"Unknown provider '{self.provider}'. Skipping LLM scoring.")
+
+    def _score_with_provider(self, documents: List[Dict[str, str]], template: _PromptTemplate) -> List[Dict[str, str]]:
+        if not documents:
+            return documents
+
+        self._initialize()
+
+        if self._init_error:
+            for doc in documents:
+                _mark_failed(doc, self._init_error)
+            return documents
+
+        if self.provider == 'api':
+            return _score_with_api(documents, self._model, self.scorer_config, self._loop, self._limiter, template)
+        elif self.provider == 'local':
+            return _score_with_local(documents, self._model, template)
+        else:
+            for doc in documents:
+                doc['llm_score'] = None
+                doc['llm_reason'] = f'Unknown provider: {self.provider}'
+            return documents
+
+    def _score_cached(self, documents: List[Dict[str, str]], template: _PromptTemplate) -> List[Dict[str, str]]:
+        """
+        Scores documents with `template`, reusing cached results where possible.
+        """
+        if self.cache is None or self.provider not in ('api', 'local'):
+            return self._score_with_provider(documents, template)
+
+        model_name = self._model_name()
+        prompt_version = f"{PROMPT_VERSION}/{template.name}"
+        if template.score_only and self.scoring_method == 'logits':
+            prompt_version += "/logits"
+        misses = []
+        for doc in documents:
+            key = ScoreCache.make_key(doc.get('text', ''), prompt_version, self.provider, model_name)
+            record = self.cache.get(key)
+            if record is None:
+                misses.append((key, doc))
+            else:
+                doc.update(record)
+
+        self._score_with_provider([doc for _, doc in misses], template)
+
+        self.cache.put_many({
+            key: {field: value for field, value in doc.items() if field.startswith('llm_')}
+            for key, doc in misses if not doc.get('llm_error')
+        })
+        return documents
+
+    def _reason_wanted(self, doc: Dict[str, str]) -> Optional[str]:
+        """
+        Returns why a score-only chunk should get a full reason ('boundary'
+        or 'audit'), or None if its score alone is enough.
+        """
+        score = doc.get('llm_score')
+        if score is None or doc.get('llm_error'):
+            return None
+
+        score_only_config = self.scorer_config.get('score_only', {})
+        threshold = self.scorer_config.get('score_threshold', 5)
+        if abs(score - threshold) <= score_only_config.get('reason_margin', 1):
+            return 'boundary'
+
+        audit_rate = score_only_config.get('audit_rate', 0.0)
+        if audit_rate > 0:
+            digest = hashlib.sha256(doc.get('text', '').encode('utf-8')).digest()
+            if int.from_bytes(digest[:8], 'big') / 2**64 < audit_rate:
+                return 'audit'
+        return None
+
+    def score(self, documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Scores a batch of pre-chunked documents in place.
+        """
+        if not documents:
+            return []
+
+        if self.mode != 'score_only':
+            return self._score_cached(documents, _FULL_PROMPT)
+
+        self._score_cached(documents, _SCORE_ONLY_PROMPT)
+        self._counters['score_only_chunks'] += len(documents)
+
+        needs_reason = []
+        for doc in documents:
+            wanted = self._reason_wanted(doc)
+            if wanted:
+                self._counters[f'reasons_{wanted}'] += 1
+                needs_reason.append(doc)
+
+        # The reason pass scores copies, so a chunk whose full prompt fails
+        # keeps its valid score-only result instead of being marked failed
+        reasoned = [
+            {field: value for field, value in doc.items() if not field.startswith('llm_')}
+            for doc in needs_reason
+        ]
+        if reasoned:
+            self._score_cached(reasoned, _FULL_PROMPT)
+        for doc, result in zip(needs_reason, reasoned):
+            if result.get('llm_error'):
+                self._counters['reasons_failed'] += 1
+                continue
+            doc['llm_reason'] = result['llm_reason']
+            # A logit-based expected score and its confidence stay; a
+            # sampled score-only score is replaced by the full prompt's
+            if self.scoring_method != 'logits':
+                doc['llm_score'] = result['llm_score']
+        return documents
+
+    @property
+    def stats(self) -> Counter:
+        """
+        Counters for the run summary (score-only reasons, local throughput).
+        """
+        stats = Counter(self._counters)
+        if isinstance(self._model, _LocalSession):
+            stats.update(self._model.stats)
+        return stats
+
+    def close(self):
+        """
+        Releases the score cache and the API event loop.
+        """
+        if self.cache is not None:
+            self.cache.close()
+        if self._loop is not None:
+            self._loop.close()
+
+
+
 def score_documents(documents: List[Dict[str, str]], config: Dict) -> List[Dict[str, str]]:
     """
     Score documents using configured LLM provider.
@@ -208,22 +889,12 @@ def score_documents(documents: List[Dict[str, str]], config: Dict) -> List[Dict[
     Returns:
         Documents with llm_score and llm_reason fields added
     """
-    scorer_config = config.get('llm_scorer', {})
-    provider = scorer_config.get('provider')
-    
     if not documents:
         logging.info("No documents to score.")
         return []
 
-    logging.info(f"LLM Scorer: Using provider '{provider}'")
-    
-    if provider == 'api':
-        return _score_with_api(documents, scorer_config)
-    elif provider == 'local':
-        return _score_with_local(documents, scorer_config)
-    else:
-        logging.warning(f"Unknown provider '{provider}'. Skipping LLM scoring.")
-        for doc in documents:
-            doc['llm_score'] = None
-            doc['llm_reason'] = f'Unknown provider: {provider}'
-        return documents
\ No newline at end of file
+    scorer = LLMScorer(config)
+    try:
+        return scorer.score(documents)
+    finally:
+        scorer.close()
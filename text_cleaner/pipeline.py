@@ -1,133 +1,629 @@
-import hashlib
+import json
 import logging
-from typing import List, Dict, Tuple
+import os
+import tempfile
+from collections import Counter
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Callable, List, Dict, Optional, Tuple, Iterable, Iterator
 from tqdm import tqdm
-from . import cleaning, llm_scorer, chunker
+from . import cleaning, llm_scorer, chunker, heuristics, dedup
+from .checkpoint import CheckpointStore
 
-def cleaning_pipeline(documents: List[Dict[str, str]], config: Dict) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+SCORING_STAGE = "llm_scoring"
+
+# Fields that stages attach to chunks for later stages; they are removed
+# before a chunk leaves the pipeline, so they never reach the output files
+_INTERNAL_FIELDS = ('text_stats', 'heuristic_features', 'heuristic_decision')
+
+def _batched(items: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
     """
-    Runs the full text cleaning, chunking, filtering, and optional LLM scoring pipeline.
+    Groups an iterable into lists of at most `batch_size` items.
     """
-    logging.info("=== Starting Cleaning, Chunking & Filtering Pipeline ===\n")
-    
-    seen_hashes = set()
-    final_documents = []
-    discarded_documents = []
-    
-    filter_config = config['filters']
-    cleaning_config = config['cleaning']
-    
-    logging.info("=== Stage 1/5: Initial Text Cleaning ===")
-    for doc in tqdm(documents, desc="Cleaning text"):
-        text = doc.get('text', '')
-        title = doc.get('title', '')
-        text = cleaning.remove_wiki_markup(text)
-        text = cleaning.remove_repeated_title(text, title)
-        text = cleaning.remove_tags(text)
-        if cleaning_config['use_aggressive_char_removal']:
-            text = cleaning.strict_mal_char(text)
-        text = cleaning.remove_extra_whitespace(text)
-        doc['text'] = text
-    
-    logging.info(f"✓ Cleaned {len(documents)} documents\n")
-    
-    logging.info("=== Stage 2/5: Semantic Chunking ===")
-    chunked_documents = chunker.chunk_documents(documents, config)
-    
-    logging.info("=== Stage 3/5: Pre-filtering Chunks ===")
-    logging.info("Filtering chunks by Malayalam ratio and word count...")
-    
-    chunks_to_score = []
-    for chunk in tqdm(chunked_documents, desc="Filtering chunks"):
-        text = chunk['text']
-        passes_malayalam_filter = cleaning.filter_by_ratio(
-            text, 
-            threshold=filter_config['malayalam_ratio_threshold']
-        )
-        passes_word_count_filter = cleaning.filter_by_count(
-            text, 
-            min_words=filter_config['min_word_count']
-        )
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _worker_settings(config: Dict) -> Tuple[int, int]:
+    """
+    Returns the (workers, chunksize) pair from the `pipeline` config section.
+    """
+    pipeline_config = config.get('pipeline', {})
+    workers = pipeline_config.get('workers', 1) or os.cpu_count()
+    chunksize = pipeline_config.get('worker_chunksize', 64)
+    return workers, chunksize
+
+def _parallel_batches(func: Callable[[List[Dict]], List[Dict]], items: Iterable[Dict], pool: Optional[Pool], config: Dict) -> Iterator[Dict]:
+    """
+    Applies a batch function to `items` in batches of `worker_chunksize`,
+    fanning batches out to `pool` when one is given.
+
+    At most one batch per worker is in flight so the stream stays bounded in
+    memory, and results are yielded in input order.
+    """
+    workers, chunksize = _worker_settings(config)
+    batches = _batched(items, chunksize)
+
+    if pool is None:
+        for batch in batches:
+            yield from func(batch)
+        return
+
+    for window in _batched(batches, workers):
+        for batch in pool.map(func, window, chunksize=1):
+            yield from batch
+
+def _clean_batch(docs: List[Dict], engine: cleaning.CleaningEngine) -> List[Dict]:
+    """
+    Applies the basic cleaning functions to a batch of documents.
+    """
+    for doc in docs:
+        doc['text'] = engine.clean(doc.get('text', ''), doc.get('title', ''))
+    return docs
+
+def _chunk_stats(chunk: Dict) -> cleaning.TextStats:
+    """
+    Returns the statistics cached on a chunk during chunking, computing and
+    caching them if they are missing.
+    """
+    if 'text_stats' not in chunk:
+        chunk['text_stats'] = cleaning.compute_text_stats(chunk['text'])._asdict()
+    return cleaning.TextStats.from_dict(chunk['text_stats'])
 
+def _prefilter_batch(chunks: List[Dict], filter_config: Dict) -> List[Dict]:
+    """
+    Marks chunks in a batch that fail the Malayalam ratio or word count
+    filters, using the statistics cached on each chunk. Chunks discarded
+    earlier are left untouched.
+    """
+    candidates = [chunk for chunk in chunks if 'discard_reason' not in chunk]
+    stats = [_chunk_stats(chunk) for chunk in candidates]
+    passes_ratio, passes_count = cleaning.filter_batch(
+        stats,
+        threshold=filter_config['malayalam_ratio_threshold'],
+        min_words=filter_config['min_word_count']
+    )
+
+    for chunk, chunk_stats, passes_malayalam_filter, passes_word_count_filter in zip(
+        candidates, stats, passes_ratio, passes_count
+    ):
         if passes_malayalam_filter and passes_word_count_filter:
-            chunks_to_score.append(chunk)
+            continue
+
+        reason = []
+        if not passes_malayalam_filter:
+            reason.append("failed malayalam ratio")
+        if not passes_word_count_filter:
+            reason.append("failed word count")
+
+        chunk['discard_reason'] = ", ".join(reason)
+        chunk['discard_stage'] = "Stage 3: Pre-filtering"
+        chunk['malayalam_ratio'] = round(chunk_stats.malayalam_ratio, 4)
+        chunk['word_count'] = chunk_stats.word_count
+
+    return chunks
+
+def _clean_stage(documents: Iterable[Dict], config: Dict, stats: Counter, pool: Optional[Pool] = None) -> Iterator[Dict]:
+    """
+    Stage 1: applies the basic cleaning functions to each document.
+    """
+    clean = partial(_clean_batch, engine=cleaning.CleaningEngine(config['cleaning']))
+
+    for doc in _parallel_batches(clean, documents, pool, config):
+        stats['documents_cleaned'] += 1
+        yield doc
+
+def _open_digest_index(config: Dict) -> dedup.DigestIndex:
+    """
+    Creates an exact-deduplication index from `deduplication.index`.
+    """
+    index_config = config.get('deduplication', {}).get('index', {})
+    return dedup.DigestIndex(
+        expected_items=index_config.get('expected_items', 1_000_000),
+        bloom_error_rate=index_config.get('bloom_error_rate'),
+        max_memory_items=index_config.get('max_memory_items'),
+        spill_dir=index_config.get('spill_dir')
+    )
+
+def _global_index_path(config: Dict) -> Optional[Path]:
+    """
+    Returns the path of the cross-run dedup index, or None if disabled.
+    """
+    global_config = config.get('deduplication', {}).get('global_index', {})
+    if not global_config.get('enabled', False):
+        return None
+    processed_dir = Path(config['paths']['processed_data_dir'])
+    return processed_dir / global_config.get('filename', 'global_dedup_index.npy')
+
+def _open_global_index(config: Dict) -> Optional[dedup.DigestIndex]:
+    """
+    Loads the cross-run dedup index of previously accepted chunks, or starts
+    an empty one on the first run.
+    """
+    path = _global_index_path(config)
+    if path is None:
+        return None
+
+    index_config = config.get('deduplication', {}).get('index', {})
+    settings = {
+        'expected_items': index_config.get('expected_items', 1_000_000),
+        'bloom_error_rate': index_config.get('bloom_error_rate'),
+    }
+    if not path.exists():
+        logging.info(f"Cross-run dedup index: {path} (new)")
+        return dedup.DigestIndex(**settings)
+
+    index = dedup.DigestIndex.load(path, **settings)
+    logging.info(f"Cross-run dedup index: {path} ({len(index)} chunks from earlier runs)")
+    return index
+
+def _close_digest_index(index: dedup.DigestIndex, stats: Counter):
+    stats['dedup_index_digests'] += len(index)
+    stats['dedup_index_bytes'] += index.nbytes
+    index.close()
+
+def _mark_earlier_run_duplicate(chunk: Dict, known: Optional[dedup.DigestIndex], stage: str, stats: Counter) -> bool:
+    """
+    Marks a chunk already accepted by an earlier run, per the cross-run index.
+    """
+    if known is None or dedup.digest64(chunk['text'].encode('utf-8')) not in known:
+        return False
+    chunk['discard_reason'] = "duplicate of an earlier run"
+    chunk['discard_stage'] = stage
+    stats['earlier_run_duplicates'] += 1
+    return True
+
+def _exact_dedup_stage(items: Iterable[Dict], config: Dict, stats: Counter, level: str,
+                       known: Optional[dedup.DigestIndex] = None) -> Iterator[Dict]:
+    """
+    Stage 2: marks exact repeats of an earlier document or chunk (`level`)
+    so they never reach the LLM scorer. Chunks are also checked against the
+    cross-run index `known`.
+    """
+    seen = _open_digest_index(config)
+    stage = "Stage 2: Early deduplication"
+
+    try:
+        for item in items:
+            if 'discard_reason' not in item:
+                if not seen.add_text(item['text']):
+                    item['discard_reason'] = "duplicate content" if level == 'chunk' else "duplicate document"
+                    item['discard_stage'] = stage
+                    stats[f'early_duplicate_{level}s'] += 1
+                else:
+                    _mark_earlier_run_duplicate(item, known, stage, stats)
+            yield item
+    finally:
+        _close_digest_index(seen, stats)
+
+def _line_digests(text: str) -> set:
+    return {dedup.digest64(line.strip().encode('utf-8')) for line in text.split('\n') if line.strip()}
+
+def _boilerplate_stage(documents: Iterable[Dict], config: Dict, stats: Counter) -> Iterator[Dict]:
+    """
+    Stage 1b: strips boilerplate lines (navigation, "see also" headings,
+    footers) found in more than `max_line_occurrences` documents.
+
+    The first pass spills the cleaned documents to a temporary JSONL file
+    while counting how many documents contain each line; the second pass
+    reads them back and drops the frequent lines before chunking.
+    """
+    boilerplate_config = config.get('deduplication', {}).get('boilerplate_lines', {})
+    max_occurrences = boilerplate_config.get('max_line_occurrences', 100)
+    line_counts = dedup.DigestMap()
+
+    with tempfile.TemporaryDirectory(prefix='boilerplate_', dir=boilerplate_config.get('spill_dir')) as spill_dir:
+        spill_path = Path(spill_dir) / 'documents.jsonl'
+
+        with open(spill_path, 'w', encoding='utf-8') as spill:
+            for doc in documents:
+                if 'discard_reason' not in doc:
+                    for key in _line_digests(doc['text']):
+                        line_counts.increment(key)
+                spill.write(json.dumps(doc, ensure_ascii=False) + '\n')
+
+        logging.info(f"Boilerplate lines: counted {len(line_counts)} distinct lines")
+
+        with open(spill_path, 'r', encoding='utf-8') as spill:
+            for record in spill:
+                doc = json.loads(record)
+                if 'discard_reason' not in doc:
+                    lines = doc['text'].split('\n')
+                    kept = [
+                        line for line in lines
+                        if not line.strip()
+                        or line_counts.get(dedup.digest64(line.strip().encode('utf-8'))) <= max_occurrences
+                    ]
+                    if len(kept) < len(lines):
+                        doc['text'] = '\n'.join(kept)
+                        stats['boilerplate_lines_removed'] += len(lines) - len(kept)
+                        stats['boilerplate_documents'] += 1
+                yield doc
+
+def _prefilter_stage(chunks: Iterable[Dict], config: Dict, stats: Counter) -> Iterator[Dict]:
+    """
+    Stage 3: marks chunks that fail the Malayalam ratio or word count filters.
+
+    Runs in this process: it only compares the statistics cached during
+    chunking, which is cheaper than sending the chunks to workers and back.
+    """
+    prefilter = partial(_prefilter_batch, filter_config=config['filters'])
+
+    for chunk in _parallel_batches(prefilter, chunks, None, config):
+        stats['chunks_total'] += 1
+        if 'discard_reason' not in chunk:
+            stats['chunks_prefiltered'] += 1
+        elif chunk['discard_stage'] != "Stage 3: Pre-filtering":
+            stats['chunks_discarded_before_prefilter'] += 1
+        yield chunk
+
+def _heuristic_stage(chunks: Iterable[Dict], config: Dict, stats: Counter) -> Iterator[Dict]:
+    """
+    Stage 4 (pre-scoring): auto-rejects obvious garbage and auto-accepts
+    obvious good prose with cheap heuristics, so only the uncertain middle
+    band is sent to the LLM.
+    """
+    heuristics_config = config.get('heuristics', {})
+    model = heuristics.load_reference_model(heuristics_config)
+    short_line_words = heuristics_config.get('short_line_words', 4)
+
+    for chunk in chunks:
+        if 'discard_reason' not in chunk:
+            features = heuristics.compute_features(chunk['text'], model, short_line_words)
+            decision, feature = heuristics.classify(features, heuristics_config)
+            chunk['heuristic_features'] = features
+            chunk['heuristic_decision'] = decision
+            stats[f'heuristic_{decision}'] += 1
+
+            if decision == 'reject':
+                chunk['discard_reason'] = f"heuristic reject ({feature})"
+                chunk['discard_stage'] = "Stage 4: Heuristic pre-scoring"
+            elif decision == 'accept':
+                chunk['llm_score'] = None
+                chunk['llm_reason'] = 'Auto-accepted by heuristic pre-scoring'
+        yield chunk
+
+def _open_checkpoint_store(config: Dict) -> Optional[CheckpointStore]:
+    """
+    Opens the checkpoint store under `processed_data_dir` if enabled.
+    """
+    checkpoint_config = config.get('checkpoint', {})
+    if not checkpoint_config.get('enabled', False):
+        return None
+
+    processed_dir = Path(config['paths']['processed_data_dir'])
+    return CheckpointStore(processed_dir / checkpoint_config.get('filename', 'checkpoints.sqlite'))
+
+def _scoring_stage(chunks: Iterable[Dict], config: Dict, stats: Counter, checkpoint: Optional[CheckpointStore] = None) -> Iterator[Dict]:
+    """
+    Stage 4: scores chunks that survived pre-filtering, one batch at a time.
+    Discarded chunks and chunks auto-accepted by the heuristics are passed
+    through untouched.
+
+    With a checkpoint store, chunks scored by an earlier run with the same
+    scorer identity (provider, model, prompt version, mode) reuse their
+    recorded result and every newly scored batch is recorded immediately.
+    """
+    scorer_config = config.get('llm_scorer', {})
+    batch_size = config.get('pipeline', {}).get('batch_size', 32)
+    scorer = llm_scorer.LLMScorer(config) if scorer_config.get('enabled', False) else None
+    # Scores from a different model, prompt or mode are never resumed
+    stage = f"{SCORING_STAGE}/{scorer.identity}" if scorer is not None else SCORING_STAGE
+
+    for batch in _batched(chunks, batch_size):
+        to_score = [
+            chunk for chunk in batch
+            if 'discard_reason' not in chunk and chunk.get('heuristic_decision') != 'accept'
+        ]
+
+        if scorer is not None:
+            if checkpoint is not None:
+                pending = []
+                for chunk in to_score:
+                    record = checkpoint.get(chunk, stage)
+                    if record is None:
+                        pending.append(chunk)
+                    else:
+                        chunk.update(record)
+                        stats['checkpoint_resumed'] += 1
+                to_score = pending
+
+            scorer.score(to_score)
+            stats['chunks_scored'] += len(to_score)
+            if scorer.cache is not None:
+                stats['score_cache_hits'] = scorer.cache.hits
+                stats['score_cache_misses'] = scorer.cache.misses
+
+            if checkpoint is not None and to_score:
+                checkpoint.put_many(stage, [
+                    (chunk, {key: value for key, value in chunk.items() if key.startswith('llm_')})
+                    for chunk in to_score if not chunk.get('llm_error')
+                ])
         else:
-            reason = []
-            if not passes_malayalam_filter: 
-                reason.append("failed malayalam ratio")
-            if not passes_word_count_filter: 
-                reason.append("failed word count")
-            
-            chunk['discard_reason'] = ", ".join(reason)
-            chunk['discard_stage'] = "Stage 3: Pre-filtering"
-            discarded_documents.append(chunk)
-    
-    total_chunks = len(chunked_documents)
-    passed_chunks = len(chunks_to_score)
-    discarded_chunks = len(discarded_documents)
-    pass_rate = (passed_chunks / total_chunks * 100) if total_chunks > 0 else 0
-    
-    logging.info(f"✓ Passed: {passed_chunks}/{total_chunks} chunks ({pass_rate:.1f}%)")
-    logging.info(f"✗ Discarded: {discarded_chunks} chunks ({100-pass_rate:.1f}%)\n")
-    
-    scored_documents = []
-    if config.get('llm_scorer', {}).get('enabled', False):
-        logging.info("=== Stage 4/5: LLM Scoring ===")
-        logging.info(f"Scoring {len(chunks_to_score)} chunks that passed pre-filtering...")
-        scored_documents = llm_scorer.score_documents(chunks_to_score, config)
-        logging.info("")
-    else:
-        logging.info("=== Stage 4/5: LLM Scoring ===")
-        logging.info("LLM scoring disabled. Skipping...\n")
-        scored_documents = chunks_to_score
-        for doc in scored_documents:
-            if 'llm_score' not in doc:
-                doc['llm_score'] = None
-                doc['llm_reason'] = 'LLM scoring disabled'
-
-    logging.info("=== Stage 5/5: Final Filtering & Deduplication ===")
+            for doc in to_score:
+                if 'llm_score' not in doc:
+                    doc['llm_score'] = None
+                    doc['llm_reason'] = 'LLM scoring disabled'
+
+        yield from batch
+
+    if scorer is not None:
+        stats.update(scorer.stats)
+        scorer.close()
+
+def _final_stage(chunks: Iterable[Dict], config: Dict, stats: Counter,
+                 known: Optional[dedup.DigestIndex] = None) -> Iterator[Dict]:
+    """
+    Stage 5: filters chunks on their LLM score (and, for logit-based scores,
+    its confidence) and drops exact duplicates unless they were already
+    removed in Stage 2, plus near-duplicates when
+    `deduplication.near_duplicates` is enabled.
+    """
     scorer_config = config.get('llm_scorer', {})
     score_threshold = scorer_config.get('score_threshold', 5)
+    confidence_threshold = scorer_config.get('confidence_threshold')
+    dedup_config = config.get('deduplication', {})
+    seen = None if dedup_config.get('early', True) else _open_digest_index(config)
 
-    for doc in tqdm(scored_documents, desc="Final filtering"):
-        text = doc['text']
-        llm_score = doc.get('llm_score')
+    near_config = dedup_config.get('near_duplicates', {})
+    lsh = None
+    if near_config.get('enabled', False):
+        lsh = dedup.MinHashLSH(
+            threshold=near_config.get('threshold', 0.8),
+            num_perm=near_config.get('num_perm', 128),
+            shingle=near_config.get('shingle', 'word'),
+            shingle_size=near_config.get('shingle_size', 5),
+            seed=near_config.get('seed', 1),
+            max_memory_items=near_config.get('max_memory_items'),
+            spill_dir=near_config.get('spill_dir')
+        )
 
-        if llm_score is not None and llm_score < score_threshold:
-            doc['discard_reason'] = f"failed llm score ({llm_score})"
-            doc['discard_stage'] = "Stage 5: LLM score filtering"
-            discarded_documents.append(doc)
-            continue
+    try:
+        for doc in chunks:
+            if 'discard_reason' in doc:
+                yield doc
+                continue
 
-        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            text = doc['text']
+            llm_score = doc.get('llm_score')
 
-        if text_hash not in seen_hashes:
-            seen_hashes.add(text_hash)
-            final_documents.append(doc)
-        else:
-            doc['discard_reason'] = "duplicate content"
-            doc['discard_stage'] = "Stage 5: Deduplication"
-            discarded_documents.append(doc)
-    
+            if llm_score is not None and llm_score < score_threshold:
+                # Logit-based expected scores are continuous: the value stays
+                # in `llm_score` so the discard breakdown keeps one entry
+                if isinstance(llm_score, float):
+                    doc['discard_reason'] = "failed llm expected score"
+                else:
+                    doc['discard_reason'] = f"failed llm score ({llm_score})"
+                doc['discard_stage'] = "Stage 5: LLM score filtering"
+                yield doc
+                continue
+
+            confidence = doc.get('llm_score_confidence')
+            if confidence_threshold is not None and confidence is not None and confidence < confidence_threshold:
+                doc['discard_reason'] = "low llm score confidence"
+                doc['discard_stage'] = "Stage 5: LLM score filtering"
+                yield doc
+                continue
+
+            if seen is not None:
+                if not seen.add_text(text):
+                    doc['discard_reason'] = "duplicate content"
+                    doc['discard_stage'] = "Stage 5: Deduplication"
+                    yield doc
+                    continue
+                if _mark_earlier_run_duplicate(doc, known, "Stage 5: Deduplication", stats):
+                    yield doc
+                    continue
+
+            if lsh is not None:
+                cluster = lsh.add(text)
+                if cluster is not None:
+                    doc['discard_reason'] = "near-duplicate content"
+                    doc['discard_stage'] = "Stage 5: Deduplication"
+                    doc['near_duplicate_cluster'] = cluster
+
+            yield doc
+    finally:
+        if seen is not None:
+            _close_digest_index(seen, stats)
+        if lsh is not None:
+            stats['near_duplicate_index_entries'] = lsh.stats['entries']
+            stats['near_duplicate_index_bytes'] = lsh.stats['bytes']
+            lsh.close()
+
+def _log_local_throughput(stats: Counter):
+    """
+    Logs local inference token counts and throughput. The rate with prefix
+    reuse counts every prompt and generated token, reused or not; the
+    before rate is the measured no-reuse baseline call on an emptied cache.
+    """
+    seconds = stats['local_seconds']
+    prompt_tokens = stats['local_prompt_tokens']
+    reused_tokens = stats['local_reused_tokens']
+    completion_tokens = stats['local_completion_tokens']
+
+    if seconds:
+        effective_rate = (prompt_tokens + completion_tokens) / seconds
+        evaluated_rate = (prompt_tokens - reused_tokens + completion_tokens) / seconds
+        logging.info(
+            f"Local inference: {prompt_tokens} prompt tokens "
+            f"({reused_tokens} reused from the cache), "
+            f"{completion_tokens} generated in {seconds:.1f}s"
+        )
+        logging.info(
+            f"Local throughput with prefix reuse: {effective_rate:.1f} prompt + generated tokens/s "
+            f"({evaluated_rate:.1f} tokens/s actually evaluated)"
+        )
+    if stats['local_baseline_seconds']:
+        baseline_rate = stats['local_baseline_tokens'] / stats['local_baseline_seconds']
+        logging.info(
+            f"Local throughput without reuse: {baseline_rate:.1f} tokens/s "
+            f"(one baseline call on an emptied cache, excluded from the counts above)"
+        )
+    if stats['local_prefix_restores']:
+        logging.info(f"Prompt prefix state restored {stats['local_prefix_restores']} times")
+    if stats['local_low_score_mass']:
+        logging.warning(f"{stats['local_low_score_mass']} chunks failed logit scoring with too little probability on the scores")
+
+def _log_summary(stats: Counter, discard_reasons: Counter):
+    """
+    Logs per-stage counts and the discard breakdown for a finished run.
+    """
     logging.info("=== Pipeline Complete ===")
-    
-    total_processed = len(final_documents) + len(discarded_documents)
-    success_rate = (len(final_documents) / total_processed * 100) if total_processed > 0 else 0
-    
+
+    total_chunks = stats['chunks_total'] - stats['chunks_discarded_before_prefilter']
+    passed_chunks = stats['chunks_prefiltered']
+    pass_rate = (passed_chunks / total_chunks * 100) if total_chunks > 0 else 0
+
+    logging.info(f"Documents cleaned: {stats['documents_cleaned']}")
+    if stats['boilerplate_lines_removed']:
+        logging.info(
+            f"Boilerplate lines removed: {stats['boilerplate_lines_removed']} "
+            f"from {stats['boilerplate_documents']} documents"
+        )
+    if stats['early_duplicate_documents'] or stats['early_duplicate_chunks']:
+        logging.info(
+            f"Early deduplication: {stats['early_duplicate_documents']} duplicate documents, "
+            f"{stats['early_duplicate_chunks']} duplicate chunks removed before scoring"
+        )
+    logging.info(f"Pre-filtering passed: {passed_chunks}/{total_chunks} chunks ({pass_rate:.1f}%)")
+    if stats['heuristic_accept'] or stats['heuristic_reject'] or stats['heuristic_uncertain']:
+        avoided = stats['heuristic_accept'] + stats['heuristic_reject']
+        logging.info(
+            f"Heuristic pre-scoring: {stats['heuristic_accept']} auto-accepted, "
+            f"{stats['heuristic_reject']} auto-rejected, {stats['heuristic_uncertain']} uncertain "
+            f"({avoided} LLM calls avoided)"
+        )
+    if stats['chunks_scored']:
+        logging.info(f"LLM scored: {stats['chunks_scored']} chunks")
+    if stats['score_cache_hits'] or stats['score_cache_misses']:
+        lookups = stats['score_cache_hits'] + stats['score_cache_misses']
+        hit_rate = stats['score_cache_hits'] / lookups * 100
+        logging.info(
+            f"Score cache: {stats['score_cache_hits']} hits, "
+            f"{stats['score_cache_misses']} misses ({hit_rate:.1f}% hit rate)"
+        )
+    if stats['score_only_chunks']:
+        reasons = stats['reasons_boundary'] + stats['reasons_audit']
+        logging.info(
+            f"Score-only mode: reasons generated for {reasons}/{stats['score_only_chunks']} chunks "
+            f"({stats['reasons_boundary']} near the threshold, {stats['reasons_audit']} audit samples)"
+        )
+        if stats['reasons_failed']:
+            logging.warning(f"Score-only mode: {stats['reasons_failed']} reason requests failed; their score-only results were kept")
+    if stats['local_seconds'] or stats['local_baseline_seconds']:
+        _log_local_throughput(stats)
+    if stats['earlier_run_duplicates']:
+        logging.info(f"Cross-run dedup: {stats['earlier_run_duplicates']} chunks already accepted by earlier runs")
+    if stats['dedup_index_digests']:
+        logging.info(
+            f"Exact dedup index: {stats['dedup_index_digests']} digests "
+            f"({stats['dedup_index_bytes'] / 2**20:.1f} MiB in memory)"
+        )
+    if stats['near_duplicate_index_entries']:
+        logging.info(
+            f"Near-duplicate index: {stats['near_duplicate_index_entries']} band entries "
+            f"({stats['near_duplicate_index_bytes'] / 2**20:.1f} MiB)"
+        )
+    if stats['checkpoint_resumed']:
+        logging.info(f"Resumed from checkpoint: {stats['checkpoint_resumed']} chunks")
+
+    final_count = stats['chunks_final']
+    discarded_count = sum(discard_reasons.values())
+    total_processed = final_count + discarded_count
+    success_rate = (final_count / total_processed * 100) if total_processed > 0 else 0
+
     logging.info(f"Total chunks processed: {total_processed}")
-    logging.info(f"✓ Final dataset: {len(final_documents)} chunks ({success_rate:.1f}%)")
-    logging.info(f"✗ Discarded: {len(discarded_documents)} chunks ({100-success_rate:.1f}%)")
-    
-    if discarded_documents:
+    logging.info(f"✓ Final dataset: {final_count} chunks ({success_rate:.1f}%)")
+    logging.info(f"✗ Discarded: {discarded_count} chunks ({100-success_rate:.1f}%)")
+
+    if discard_reasons:
         logging.info("Discard breakdown:")
-        discard_reasons = {}
-        for doc in discarded_documents:
-            reason = doc.get('discard_reason', 'unknown')
-            discard_reasons[reason] = discard_reasons.get(reason, 0) + 1
-        
-        for reason, count in sorted(discard_reasons.items(), key=lambda x: x[1], reverse=True):
+        for reason, count in discard_reasons.most_common():
             logging.info(f"  - {reason}: {count} chunks")
-    
+
     logging.info("")
-    
-    return final_documents, discarded_documents
\ No newline at end of file
+
+def iter_pipeline(documents: Iterable[Dict[str, str]], config: Dict) -> Iterator[Dict[str, str]]:
+    """
+    Streams documents through cleaning, chunking, filtering, optional LLM
+    scoring and deduplication.
+
+    Every chunk is yielded as soon as it leaves the final stage. Discarded
+    chunks carry `discard_reason` and `discard_stage`; all others belong in
+    the cleaned output. Only one scoring batch is held in memory at a time.
+    """
+    logging.info("=== Starting Cleaning, Chunking & Filtering Pipeline ===\n")
+
+    stats = Counter()
+    discard_reasons = Counter()
+    total_docs = len(documents) if hasattr(documents, '__len__') else None
+
+    workers, _ = _worker_settings(config)
+    pool = Pool(workers) if workers > 1 else None
+    if pool is not None:
+        logging.info(f"Cleaning with {workers} worker processes")
+    checkpoint = _open_checkpoint_store(config)
+    known = _open_global_index(config)
+
+    try:
+        dedup_config = config.get('deduplication', {})
+        stream = _clean_stage(documents, config, stats, pool)
+        if dedup_config.get('document_level', False):
+            stream = _exact_dedup_stage(stream, config, stats, level='document')
+        if dedup_config.get('boilerplate_lines', {}).get('enabled', False):
+            stream = _boilerplate_stage(stream, config, stats)
+        stream = chunker.iter_chunks(stream, config, total_docs=total_docs)
+        if dedup_config.get('early', True):
+            stream = _exact_dedup_stage(stream, config, stats, level='chunk', known=known)
+        stream = _prefilter_stage(stream, config, stats)
+        if config.get('heuristics', {}).get('enabled', False):
+            stream = _heuristic_stage(stream, config, stats)
+        stream = _scoring_stage(stream, config, stats, checkpoint)
+        stream = _final_stage(stream, config, stats, known)
+
+        for doc in tqdm(stream, desc="Processing chunks"):
+            for field in _INTERNAL_FIELDS:
+                doc.pop(field, None)
+            if 'discard_reason' in doc:
+                discard_reasons[doc['discard_reason']] += 1
+            else:
+                stats['chunks_final'] += 1
+                if known is not None:
+                    known.add_text(doc['text'])
+            yield doc
+
+        # Only a completed run updates the cross-run index, so an
+        # interrupted run can be resumed without its chunks counting as seen
+        if known is not None:
+            known.save(_global_index_path(config))
+            logging.info(f"Cross-run dedup index saved ({len(known)} chunks)")
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if checkpoint is not None:
+            checkpoint.close()
+        if known is not None:
+            known.close()
+
+    _log_summary(stats, discard_reasons)
+
+def cleaning_pipeline(documents: List[Dict[str, str]], config: Dict) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Runs the full text cleaning, chunking, filtering, and optional LLM scoring pipeline.
+    """
+    final_documents = []
+    discarded_documents = []
+
+    for doc in iter_pipeline(documents, config):
+        if 'discard_reason' in doc:
+            discarded_documents.append(doc)
+        else:
+            final_documents.append(doc)
+
+    return final_documents, discarded_documents
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Optional
+
+class TokenBucketLimiter:
+    """
+    Async token-bucket rate limiter for requests per minute and tokens per
+    minute.
+
+    Each bucket holds up to one minute's allowance and refills continuously.
+    `acquire()` waits until both buckets can cover a request, so bursts are
+    allowed up to the per-minute limits while the long-run rate never
+    exceeds them. A limit of None disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = requests_per_minute or 0.0
+        self._token_allowance = tokens_per_minute or 0.0
+        self._last_refill = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute,
+                self._request_allowance + elapsed_minutes * self.requests_per_minute
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute,
+                self._token_allowance + elapsed_minutes * self.tokens_per_minute
+            )
+
+    def _wait_seconds(self, tokens: float) -> float:
+        """
+        Returns how long to wait until a request of `tokens` fits, or 0.
+        """
+        wait = 0.0
+        if self.requests_per_minute and self._request_allowance < 1:
+            wait = max(wait, (1 - self._request_allowance) / self.requests_per_minute * 60)
+        if self.tokens_per_minute and self._token_allowance < tokens:
+            wait = max(wait, (tokens - self._token_allowance) / self.tokens_per_minute * 60)
+        return wait
+
+    async def acquire(self, tokens: float = 0):
+        """
+        Waits until one request of `tokens` tokens is allowed, then takes it
+        from the buckets. Requests larger than a full minute's token
+        allowance are clamped to it so they cannot block forever.
+        """
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = self._wait_seconds(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.requests_per_minute:
+                self._request_allowance -= 1
+            if self.tokens_per_minute:
+                self._token_allowance -= tokens
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+class ScoreCache:
+    """
+    Persistent, size-bounded cache of LLM scoring results shared across runs.
+
+    Entries are content-addressed: the key is a hash of the chunk text, the
+    prompt template version, the provider and the model name, so a result is
+    reused only when all of them are unchanged. When the cache grows beyond
+    `max_entries`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 1_000_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "cache_key TEXT PRIMARY KEY, record TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+        logging.info(f"Score cache: {self.path} ({self._size} entries, max {self.max_entries})")
+
+    @staticmethod
+    def make_key(text: str, prompt_version: str, provider: str, model_name: str) -> str:
+        """
+        Returns the content address of a scoring request.
+        """
+        digest = hashlib.sha256()
+        for part in (prompt_version, provider, model_name, text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Returns the cached record for `key`, refreshing its recency.
+        """
+        row = self._conn.execute(
+            "SELECT record FROM scores WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute(
+            "UPDATE scores SET last_used = ? WHERE cache_key = ?", (time.time_ns(), key)
+        )
+        return json.loads(row[0])
+
+    def put_many(self, records: Dict[str, Dict]):
+        """
+        Stores several records, evicts least recently used entries beyond
+        `max_entries` and commits.
+        """
+        now = time.time_ns()
+        for key, record in records.items():
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO scores (cache_key, record, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(record, ensure_ascii=False), now)
+            ).rowcount
+            self._size += inserted
+
+        overflow = self._size - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM scores WHERE cache_key IN "
+                "(SELECT cache_key FROM scores ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            self._size -= overflow
+
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()